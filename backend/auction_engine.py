@@ -0,0 +1,302 @@
+"""
+In-process auction engine.
+
+Holds the live state of each active auction (current lot, high bid, squad
+budgets and usernames) so bids are validated in memory instead of with a chain
+of Mongo reads. Accepted bids are persisted by a write-behind writer that
+batches inserts in the background and is flushed on shutdown.
+
+Persisting a batch also records the new high bid on each tournament document,
+so the database path and a restarted engine see the same high bid, and bumps
+the tournament's version so cached bid lists are revalidated.
+
+While a lot is being closed (`closing`), the engine rejects bids on it, so
+no bid is acknowledged after the flush that the lot's winner is read from.
+
+The engine assumes this process is the only one accepting bids for a
+tournament, so it is only enabled with the in-memory broadcast backend.
+"""
+import asyncio
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+import projections
+
+logger = logging.getLogger(__name__)
+
+
+class LiveAuction:
+    """Everything needed to validate a bid on the current lot"""
+
+    def __init__(self, tournament: dict, squads: list, users: list):
+        self.tournament_id = tournament["id"]
+        self.status = tournament["status"]
+        self.current_team_id = tournament.get("current_team_id")
+        self.bid_end_time = tournament.get("bid_end_time")
+        self.minimum_bid = tournament["minimum_bid"]
+        self.budget_per_user = tournament["budget_per_user"]
+        self.teams_per_user = tournament["teams_per_user"]
+        self.bid_coalesce_ms = tournament.get("bid_coalesce_ms", 0)
+        # user_id -> [total_spent, teams_owned]
+        self.squads = {squad["user_id"]: [squad.get("total_spent", 0), len(squad.get("teams", []))] for squad in squads}
+        self.usernames = {user["id"]: user["username"] for user in users}
+        self.high_bid = tournament.get("current_high_bid")
+        self.high_bidder_id = tournament.get("current_high_bidder_id")
+
+    def validate_bid(self, user_id: str, amount: int):
+        """Raise the same HTTP errors as the database-backed bid route"""
+        if self.status != "auction_active":
+            raise HTTPException(status_code=400, detail="Auction not active")
+
+        if not self.bid_end_time or datetime.utcnow() > self.bid_end_time:
+            raise HTTPException(status_code=400, detail="Bidding time expired")
+
+        if amount < self.minimum_bid:
+            raise HTTPException(status_code=400, detail="Bid too low")
+
+        squad = self.squads.get(user_id)
+        if squad is None:
+            raise HTTPException(status_code=404, detail="Squad not found")
+
+        total_spent, teams_owned = squad
+        remaining_budget = self.budget_per_user - total_spent
+        remaining_teams = self.teams_per_user - teams_owned
+
+        if remaining_teams > 1:
+            max_bid = remaining_budget - ((remaining_teams - 1) * self.minimum_bid)
+        else:
+            max_bid = remaining_budget
+
+        if amount > max_bid:
+            raise HTTPException(status_code=400, detail="Insufficient budget")
+
+        if self.high_bid is not None and amount <= self.high_bid:
+            raise HTTPException(status_code=400, detail="Bid must be higher than current highest")
+
+
+class BidWriter:
+    """
+    Write-behind persistence for accepted bids.
+
+    Bids are queued and inserted in batches by a background task. The queue is
+    bounded, so if Mongo falls behind, `submit` waits and the lag stays bounded.
+
+    Submitted and written bids are counted per tournament, so flushing one
+    tournament only waits for its own bids, not for every room's traffic.
+    A batch Mongo keeps rejecting is retried a bounded number of times, then
+    written bid by bid; bids that still fail are logged and dropped.
+    """
+
+    def __init__(self, db, max_pending: int = 1000, batch_size: int = 200, max_attempts: int = 5):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: asyncio.Task = None
+        self._submitted: Counter = Counter()
+        self._written: Counter = Counter()
+        # tournament_id -> [(submitted count to reach, future)]
+        self._waiters: Dict[str, List[Tuple[int, asyncio.Future]]] = {}
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Persist everything still queued, then stop the writer"""
+        await self.flush()
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, bid: dict):
+        # Counted before it is queued, so a flush that starts while we wait for
+        # room in the queue still waits for this bid
+        self._submitted[bid["tournament_id"]] += 1
+        try:
+            await self.queue.put(bid)
+        except BaseException:
+            self._mark_done([bid])  # Never queued - nothing to wait for
+            raise
+
+    async def flush(self, tournament_id: Optional[str] = None):
+        """Wait until the bids submitted so far for `tournament_id` (default: all) have been written"""
+        if self._task is None:
+            return
+        if tournament_id is None:
+            await self.queue.join()
+            return
+        target = self._submitted[tournament_id]
+        if self._written[tournament_id] >= target:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tournament_id, []).append((target, waiter))
+        await waiter
+
+    def _mark_done(self, batch: list):
+        for tournament_id, count in Counter(bid["tournament_id"] for bid in batch).items():
+            self._written[tournament_id] += count
+            written = self._written[tournament_id]
+            waiters = self._waiters.pop(tournament_id, [])
+            pending = [(target, waiter) for target, waiter in waiters if target > written]
+            for target, waiter in waiters:
+                if target <= written and not waiter.done():
+                    waiter.set_result(None)
+            if pending:
+                self._waiters[tournament_id] = pending
+            elif written >= self._submitted[tournament_id]:
+                # Caught up - drop the counters so idle tournaments cost nothing
+                del self._written[tournament_id]
+                del self._submitted[tournament_id]
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._write(batch)
+                await self._record_high_bids(batch)
+            except Exception:
+                logger.exception(f"Write-behind of {len(batch)} bids failed")
+            finally:
+                self._mark_done(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write(self, batch: list):
+        delay = 0.1
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                # insert_many mutates the dicts with _id; copies keep retries safe
+                await self.db.bids.insert_many([dict(bid) for bid in batch], ordered=False)
+                return
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if write_errors and all(error.get("code") == 11000 for error in write_errors):
+                    return  # Only duplicates: an earlier attempt already wrote the rest
+                logger.warning(f"Write-behind of {len(batch)} bids failed (attempt {attempt}): {e}")
+            except PyMongoError as e:
+                logger.warning(f"Write-behind of {len(batch)} bids failed (attempt {attempt}): {e}")
+            if attempt < self.max_attempts:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5)
+        # Isolate whatever Mongo keeps rejecting instead of holding up every bid behind it
+        for bid in batch:
+            try:
+                await self.db.bids.insert_one(dict(bid))
+            except DuplicateKeyError:
+                pass
+            except PyMongoError as e:
+                logger.error(f"Dropping bid that could not be written: {bid} ({e})")
+
+    async def _record_high_bids(self, batch: list):
+        """Store the highest bid of the batch per lot on its tournament document and bump its version"""
+        highest = {}
+        for bid in batch:
+            key = (bid["tournament_id"], bid["team_id"])
+            if key not in highest or bid["amount"] > highest[key]["amount"]:
+                highest[key] = bid
+        operations = [
+            UpdateOne(
+                {
+                    "id": bid["tournament_id"],
+                    "current_team_id": bid["team_id"],
+                    "$or": [
+                        {"current_high_bid": None},
+                        {"current_high_bid": {"$lt": bid["amount"]}}
+                    ]
+                },
+                {"$set": {"current_high_bid": bid["amount"], "current_high_bidder_id": bid["user_id"]}}
+            )
+            for bid in highest.values()
+        ]
+        # Bumped last: the new version must not be visible before the data it covers
+        operations.extend(
+            UpdateOne({"id": tournament_id}, {"$inc": {"version": 1}})
+            for tournament_id in {bid["tournament_id"] for bid in batch}
+        )
+        try:
+            await self.db.tournaments.bulk_write(operations)
+        except PyMongoError as e:
+            logger.warning(f"Failed to record high bids for {len(highest)} lots: {e}")
+
+
+class AuctionEngine:
+    def __init__(self, db, writer: BidWriter):
+        self.db = db
+        self.writer = writer
+        self.auctions: Dict[str, LiveAuction] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate() so a load that raced with a change is discarded
+        self._generations: Dict[str, int] = {}
+        # tournament_id -> number of lot closes in progress
+        self._closing: Counter = Counter()
+
+    def invalidate(self, tournament_id: str):
+        """Drop cached state after any change other than a bid (lot change, join, timer reset)"""
+        self.auctions.pop(tournament_id, None)
+        self._loading.pop(tournament_id, None)
+        self._generations[tournament_id] = self._generations.get(tournament_id, 0) + 1
+
+    @contextmanager
+    def closing(self, tournament_id: str):
+        """Reject bids on the tournament while the block closes its current lot"""
+        self._closing[tournament_id] += 1
+        try:
+            yield
+        finally:
+            self._closing[tournament_id] -= 1
+            if not self._closing[tournament_id]:
+                del self._closing[tournament_id]
+
+    async def get(self, tournament_id: str) -> Optional[LiveAuction]:
+        while True:
+            auction = self.auctions.get(tournament_id)
+            if auction is not None:
+                return auction
+            generation = self._generations.get(tournament_id, 0)
+            loading = self._loading.get(tournament_id)
+            if loading is None:
+                loading = self._loading[tournament_id] = asyncio.ensure_future(self._load(tournament_id))
+            try:
+                auction = await asyncio.shield(loading)
+            finally:
+                if self._loading.get(tournament_id) is loading:
+                    del self._loading[tournament_id]
+            if self._generations.get(tournament_id, 0) != generation:
+                continue  # Invalidated while loading - read again
+            # Only keep live auctions; anything else is re-read on the next bid
+            if auction is not None and auction.status == "auction_active":
+                auction = self.auctions.setdefault(tournament_id, auction)
+            return auction
+
+    async def _load(self, tournament_id: str) -> Optional[LiveAuction]:
+        # Bids still in the write-behind queue must be reflected in the stored high bid
+        await self.writer.flush(tournament_id)
+        tournament = await self.db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_LIVE)
+        if not tournament:
+            return None
+        squads, users = await asyncio.gather(
+            self.db.squads.find({"tournament_id": tournament_id}, projections.SQUAD_LIVE).to_list(1000),
+            self.db.users.find({"id": {"$in": tournament.get("participants", [])}}, projections.USER_NAMES).to_list(1000)
+        )
+        return LiveAuction(tournament, squads, users)
+
+    async def accept_bid(self, tournament_id: str, user_id: str, amount: int) -> LiveAuction:
+        """Validate a bid against live state and record it as the new high bid"""
+        auction = await self.get(tournament_id)
+        if auction is None:
+            raise HTTPException(status_code=404, detail="Tournament not found")
+        # No awaits between validating and recording, so bids cannot interleave
+        if tournament_id in self._closing:
+            raise HTTPException(status_code=400, detail="Lot is closing")
+        auction.validate_bid(user_id, amount)
+        auction.high_bid = amount
+        auction.high_bidder_id = user_id
+        return auction
@@ -0,0 +1,42 @@
+"""
+Auction lot queue.
+
+A tournament walks `auction_order` (shuffled once when the auction starts)
+with `auction_cursor`. Lots that close without a bid wait in
+`reauction_queue` and come back, in the order they closed, once the order is
+used up. Every step is a $inc/$push/$pop update, so the queue is never
+rewritten; the helpers here only compute those updates.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def next_lot(auction_order: List[str], auction_cursor: int, reauction_queue: List[str],
+             current_team_id: str, had_bids: bool) -> Tuple[Optional[str], Dict[str, dict]]:
+    """
+    The lot to open after `current_team_id` closes, and the update that moves
+    the queue there. None means nothing is left to auction.
+    """
+    if auction_cursor < len(auction_order):
+        update = {"$inc": {"auction_cursor": 1}}
+        if not had_bids:
+            update["$push"] = {"reauction_queue": current_team_id}
+        return auction_order[auction_cursor], update
+
+    if reauction_queue:
+        if had_bids:
+            return reauction_queue[0], {"$pop": {"reauction_queue": -1}}
+        # Drop the head and append the unsold lot in one $push
+        return reauction_queue[0], {
+            "$push": {"reauction_queue": {"$each": [current_team_id], "$slice": -len(reauction_queue)}}
+        }
+
+    # Nothing else is waiting, so an unsold lot is simply auctioned again; a sold
+    # one is never reopened
+    if had_bids:
+        return None, {}
+    return current_team_id, {}
+
+
+def auction_complete(settled_team_ids: Iterable[str], auction_order: List[str]) -> bool:
+    """Every team has been sold once"""
+    return set(settled_team_ids).issuperset(auction_order)
@@ -0,0 +1,90 @@
+"""
+Per-item cost of serializing a 1000-item list response, before and after
+single-pass serialization.
+
+"before" is what a route returning `[Model(**doc) for doc in docs]` costs:
+building the models, FastAPI validating them against `response_model`, and
+rendering with JSONResponse. "after" is `documents_response`.
+
+    cd backend && python bench_serialization.py
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# server.py reads these at import time; no connection is made
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from typing import List  # noqa: E402
+
+from serialization import documents_response  # noqa: E402
+from server import Bid, ChatMessage, Tournament  # noqa: E402
+
+ITEMS = 1000
+ROUNDS = 20
+
+
+def tournament_doc(i: int) -> dict:
+    return Tournament(
+        name=f"Tournament {i}",
+        admin_id=str(uuid.uuid4()),
+        participants=[str(uuid.uuid4()) for _ in range(8)],
+        competition_type="champions_league",
+        teams_per_user=4,
+        auction_order=[str(uuid.uuid4()) for _ in range(32)],
+        created_at=datetime(2024, 1, 1) + timedelta(minutes=i),
+    ).dict()
+
+
+def bid_doc(i: int) -> dict:
+    return Bid(tournament_id="t", user_id=f"u{i % 8}", team_id=f"team{i % 32}", amount=10 + i).dict()
+
+
+def chat_doc(i: int) -> dict:
+    return ChatMessage(tournament_id="t", user_id=f"u{i % 8}", username="player", message=f"message {i}").dict()
+
+
+async def before(model, docs):
+    field = create_response_field(name="response", type_=List[model])
+    content = await serialize_response(field=field, response_content=[model(**doc) for doc in docs])
+    return JSONResponse(content).body
+
+
+async def after(model, docs):
+    return documents_response(model, docs).body
+
+
+def per_item_us(serialize, model, docs) -> float:
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(serialize(model, docs))  # warm up
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            loop.run_until_complete(serialize(model, docs))
+        elapsed = time.perf_counter() - start
+    finally:
+        loop.close()
+    return elapsed / (ROUNDS * len(docs)) * 1e6
+
+
+def main():
+    cases = [
+        (Tournament, [tournament_doc(i) for i in range(ITEMS)]),
+        (Bid, [bid_doc(i) for i in range(ITEMS)]),
+        (ChatMessage, [chat_doc(i) for i in range(ITEMS)]),
+    ]
+    print(f"{'model':<12}{'before µs/item':>16}{'after µs/item':>16}{'speedup':>10}")
+    for model, docs in cases:
+        old = per_item_us(before, model, docs)
+        new = per_item_us(after, model, docs)
+        print(f"{model.__name__:<12}{old:>16.2f}{new:>16.2f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
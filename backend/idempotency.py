@@ -0,0 +1,70 @@
+"""
+Idempotency keys for mutating routes.
+
+A client that retries a request (for example after a flaky mobile connection
+dropped the response) sends the same `Idempotency-Key` header again. The first
+request claims the key in the `idempotency_keys` collection and stores its
+response there; a retry gets the stored response back from a single lookup
+instead of running the route a second time. Keys expire through the TTL index
+declared in indexes.py.
+
+A request that fails releases its key, so the client can simply retry it.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+
+
+class IdempotencyStore:
+    def __init__(self, db):
+        self.collection = db.idempotency_keys
+
+    async def run(self, scope: str, key: Optional[str], handler: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `handler` once per (scope, key); without a key it always runs"""
+        if not key:
+            return await handler()
+
+        key_id = f"{scope}:{key}"
+        stored = await self._claim(key_id)
+        if stored is not None:
+            return stored["response"]
+
+        try:
+            response = await handler()
+        except BaseException:
+            await self.collection.delete_one({"_id": key_id, "state": STATE_PENDING})
+            raise
+
+        await self.collection.update_one(
+            {"_id": key_id},
+            {"$set": {"state": STATE_DONE, "response": jsonable_encoder(response)}}
+        )
+        return response
+
+    async def _claim(self, key_id: str) -> Optional[dict]:
+        """Claim the key, or return the finished record of an earlier request"""
+        while True:
+            try:
+                await self.collection.insert_one({
+                    "_id": key_id,
+                    "state": STATE_PENDING,
+                    "created_at": datetime.utcnow()
+                })
+                return None
+            except DuplicateKeyError:
+                existing = await self.collection.find_one({"_id": key_id})
+            if existing is None:
+                continue  # Expired or released in between - claim it again
+            if existing["state"] != STATE_DONE:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            logger.info(f"Replaying stored response for idempotency key {key_id}")
+            return existing
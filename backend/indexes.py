@@ -0,0 +1,114 @@
+"""
+Index bootstrap.
+
+Every hot query in server.py filters on application ids rather than `_id`,
+so each collection declares the indexes those queries need here. On startup
+`ensure_indexes` creates anything missing (create_indexes is a no-op for
+indexes that already exist) and logs any declared index it could not build
+and any index in the database that is not declared here.
+
+Unique indexes back correctness, not just speed: join codes and emails must
+not collide, write-behind bid retries rely on `bids.id` rejecting duplicates,
+and a user has one squad per tournament.
+
+TTL indexes take their lifetime from the environment; when it changes, the
+existing index is updated in place with collMod.
+"""
+import logging
+import os
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+INDEX_OPTIONS_CONFLICT = 85
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "tournaments": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Tournaments created before join codes existed have an empty code
+        IndexModel([("join_code", ASCENDING)], unique=True, partialFilterExpression={"join_code": {"$gt": ""}}),
+        # Lobby listing: newest first, optionally by participant, status or competition.
+        # The status index also serves the lookups of running auctions at startup.
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("participants", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("competition_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "bids": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Covers the per-tournament bid list and the highest bids on a lot
+        IndexModel([("tournament_id", ASCENDING), ("team_id", ASCENDING), ("amount", DESCENDING)]),
+        # Bid history in time order, and `since` ranges over it
+        IndexModel([("tournament_id", ASCENDING), ("timestamp", ASCENDING)]),
+    ],
+    "squads": [
+        IndexModel([("tournament_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ],
+    "chat_messages": [
+        # Chat history in time order, and `since` ranges over it
+        IndexModel([("tournament_id", ASCENDING), ("timestamp", ASCENDING)]),
+    ],
+    "teams": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Catalog sync upserts on (competition, name); also serves competition lookups
+        IndexModel([("competition", ASCENDING), ("name", ASCENDING)], unique=True),
+    ],
+    "idempotency_keys": [
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+    ],
+}
+
+
+async def update_ttl(db, collection_name: str, model: IndexModel):
+    """Apply a changed expireAfterSeconds to an existing TTL index"""
+    ttl = model.document["expireAfterSeconds"]
+    try:
+        await db.command(
+            "collMod", collection_name,
+            index={"keyPattern": model.document["key"], "expireAfterSeconds": ttl}
+        )
+        logger.info(f"Updated TTL of {collection_name}.{model.document['name']} to {ttl}s")
+    except OperationFailure as e:
+        logger.error(f"Could not update TTL of {collection_name}.{model.document['name']}: {e}")
+
+
+async def ensure_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Create declared indexes and report missing/extra ones per collection"""
+    report = {"missing": {}, "extra": {}}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        for model in models:
+            try:
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                if e.code == INDEX_OPTIONS_CONFLICT and "expireAfterSeconds" in model.document:
+                    await update_ttl(db, collection_name, model)
+                    continue
+                # Usually existing duplicates blocking a unique index - keep starting up
+                logger.error(f"Could not create index {collection_name}.{model.document['name']}: {e}")
+
+        declared = {model.document["name"] for model in models}
+        existing = set()
+        async for index in collection.list_indexes():
+            existing.add(index["name"])
+        existing.discard("_id_")
+
+        missing = sorted(declared - existing)
+        extra = sorted(existing - declared)
+        if missing:
+            report["missing"][collection_name] = missing
+            logger.warning(f"Missing indexes on {collection_name}: {', '.join(missing)}")
+        if extra:
+            report["extra"][collection_name] = extra
+            logger.warning(f"Undeclared indexes on {collection_name}: {', '.join(extra)}")
+
+    logger.info(f"Indexes checked on {len(INDEXES)} collections")
+    return report
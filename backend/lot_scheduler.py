@@ -0,0 +1,99 @@
+"""
+Server-side lot timers.
+
+Each active tournament has one pending deadline: the `bid_end_time` of its
+current lot. A single background task sleeps until the earliest deadline and
+then calls the expiry callback once for that lot, so clients no longer have to
+race each other to advance the auction.
+
+Deadlines live in a heap. Rescheduling a tournament (timer reset, new lot)
+pushes a fresh entry and leaves the old one behind; stale entries are skipped
+when they surface. Timers are in memory only and are rebuilt from Mongo on
+startup.
+
+If the expiry callback fails and nothing has rescheduled the tournament in the
+meantime, the same lot is tried again after `retry_delay`, so an error never
+leaves a running auction without a timer.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ExpiryCallback = Callable[[str, str], Awaitable[None]]
+
+
+class LotScheduler:
+    def __init__(self, on_expire: ExpiryCallback, retry_delay: float = 5):
+        self.on_expire = on_expire
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[datetime, str, str]] = []
+        # tournament_id -> (deadline, team_id) of the timer that is still live
+        self._deadlines: Dict[str, Tuple[datetime, str]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task = None
+        self._expiring: Set[asyncio.Task] = set()
+
+    async def start(self, db):
+        """Rebuild timers for every running auction, then start the timer loop"""
+        self._wakeup = asyncio.Event()
+        cursor = db.tournaments.find(
+            {"status": "auction_active", "bid_end_time": {"$ne": None}},
+            {"_id": 0, "id": 1, "current_team_id": 1, "bid_end_time": 1}
+        )
+        async for tournament in cursor:
+            self.schedule(tournament["id"], tournament.get("current_team_id"), tournament["bid_end_time"])
+        logger.info(f"Lot scheduler started with {len(self._deadlines)} pending timers")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._expiring):
+            task.cancel()
+
+    def schedule(self, tournament_id: str, team_id: Optional[str], deadline: Optional[datetime]):
+        """Set (or replace) the expiry of a tournament's current lot"""
+        if not team_id or not deadline:
+            self.cancel(tournament_id)
+            return
+        self._deadlines[tournament_id] = (deadline, team_id)
+        heapq.heappush(self._heap, (deadline, tournament_id, team_id))
+        self._wakeup.set()
+
+    def cancel(self, tournament_id: str):
+        self._deadlines.pop(tournament_id, None)
+
+    def pending(self) -> int:
+        return len(self._deadlines)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, tournament_id, team_id = heapq.heappop(self._heap)
+                if self._deadlines.get(tournament_id) != (deadline, team_id):
+                    continue  # Superseded by a later schedule() or cancelled
+                del self._deadlines[tournament_id]
+                task = asyncio.create_task(self._expire(tournament_id, team_id))
+                self._expiring.add(task)
+                task.add_done_callback(self._expiring.discard)
+
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, tournament_id: str, team_id: str):
+        try:
+            await self.on_expire(tournament_id, team_id)
+        except Exception as e:
+            logger.error(f"Lot expiry failed for tournament {tournament_id}, team {team_id}: {e}")
+            if tournament_id not in self._deadlines:
+                self.schedule(tournament_id, team_id, datetime.utcnow() + timedelta(seconds=self.retry_delay))
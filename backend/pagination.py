@@ -0,0 +1,33 @@
+"""
+Keyset pagination for the tournament lobby.
+
+Tournaments are listed newest first by (created_at, id). A cursor is the
+opaque position of the last row of a page, and decodes to the Mongo filter
+for the rows after it, so a page costs an index range scan however deep it
+is.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_tournament_cursor(tournament: dict) -> str:
+    """Opaque position after `tournament` in newest-first order"""
+    position = json.dumps([tournament["created_at"].isoformat(), tournament["id"]])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_tournament_cursor(cursor: str) -> dict:
+    """Filter for the tournaments after the cursor position"""
+    try:
+        created_at, tournament_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": tournament_id}}
+    ]}
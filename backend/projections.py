@@ -0,0 +1,45 @@
+"""
+Field projections for Mongo reads.
+
+Tournament documents carry the full team list, the auction order and the
+participants, so a handler that needs three fields should not decode all of
+them. Each read names the projection for what it actually uses here, next to
+the other callers' projections, so a handler that starts using a new field
+only needs one line changed. Full-model reads use
+`serialization.model_projection` instead.
+"""
+from typing import Dict
+
+
+def fields(*names: str) -> Dict[str, int]:
+    """Projection returning only `names` (never `_id`)"""
+    return {"_id": 0, **{name: 1 for name in names}}
+
+
+EXISTS = fields("id")
+USERNAME = fields("username")
+USER_NAMES = fields("id", "username")
+TEAM_IDS = fields("id")
+
+TOURNAMENT_JOIN = fields("id", "entry_fee")
+TOURNAMENT_VERSION = fields("version")
+# Everything check_bid_against_tournament and the budget check read
+TOURNAMENT_BID = fields(
+    "status", "current_team_id", "bid_end_time", "current_high_bid",
+    "minimum_bid", "budget_per_user", "teams_per_user", "bid_coalesce_ms"
+)
+# LiveAuction state, plus participants to load their usernames
+TOURNAMENT_LIVE = fields(
+    "id", "status", "current_team_id", "bid_end_time", "current_high_bid", "current_high_bidder_id",
+    "minimum_bid", "budget_per_user", "teams_per_user", "bid_coalesce_ms", "participants"
+)
+TOURNAMENT_START = fields("admin_id", "participants", "teams")
+TOURNAMENT_LOT = fields("status", "current_team_id", "bid_end_time")
+TOURNAMENT_ADVANCE = fields(
+    "id", "status", "current_team_id", "current_high_bid", "current_high_bidder_id",
+    "auction_order", "auction_cursor", "reauction_queue", "settled_team_ids"
+)
+TOURNAMENT_FIX_TEAMS = fields("competition_type", "current_team_id")
+
+SQUAD_BUDGET = fields("total_spent", "teams")
+SQUAD_LIVE = fields("user_id", "total_spent", "teams")
@@ -0,0 +1,599 @@
+"""
+Real-time fan-out for auction rooms.
+
+Each WebSocket gets its own bounded send queue drained by a dedicated writer
+task, so a broadcast only enqueues frames and never waits on a slow client.
+Every broadcast is encoded once per frame format and the same frame object is
+shared by all subscribers in the room.
+
+Messages travel through a pluggable broadcast backend before reaching local
+sockets, so several uvicorn workers can serve the same tournament.
+
+Every tournament event is stamped with a per-tournament sequence number and
+kept in a bounded replay buffer, so a reconnecting client can resume from the
+last sequence it applied instead of refetching the whole room. Clients that
+cannot resume get a full snapshot as their first frame instead.
+
+A heartbeat loop pings every socket, evicts sockets that stop answering and
+drops the registry entries and replay buffers of rooms nobody is in, so memory
+and broadcast cost stay flat on a long-running server.
+
+Sequence numbers come from a shared counter, so with several workers an event
+can reach a worker before an earlier one still travelling through the bus.
+Each room therefore delivers in sequence order: an event that arrives early is
+held back until the missing ones arrive, or for at most `reorder_timeout`,
+after which the gap is skipped and clients resync from a snapshot.
+
+High-frequency state (the current high bid) can be coalesced per tournament:
+within a short window only the latest message is published, while every other
+event flushes the pending one first and then goes out immediately, in order.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, Optional, Union
+
+import orjson
+from bson import ObjectId
+from fastapi import WebSocket, WebSocketDisconnect
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - binary frames are simply not offered
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for "try again later" - used when a client falls behind
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# WebSocket close code for "going away" - used when a client stops answering pings
+IDLE_CLOSE_CODE = 1001
+
+# Frame formats. Clients opt into msgpack by offering MSGPACK_SUBPROTOCOL in
+# Sec-WebSocket-Protocol; everyone else gets JSON text frames.
+FRAME_FORMAT_JSON = "json"
+FRAME_FORMAT_MSGPACK = "msgpack"
+JSON_SUBPROTOCOL = "pifa.json.v1"
+MSGPACK_SUBPROTOCOL = "pifa.msgpack.v1"
+
+Frame = Union[str, bytes]
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a WebSocket frame")
+
+
+def encode_json(message: dict) -> str:
+    return orjson.dumps(message).decode()
+
+
+def encode_msgpack(message: dict) -> bytes:
+    return msgpack.packb(message, default=_encode_default)
+
+
+FRAME_ENCODERS = {
+    FRAME_FORMAT_JSON: encode_json,
+    FRAME_FORMAT_MSGPACK: encode_msgpack,
+}
+
+
+def decode_frame(message: dict) -> Optional[dict]:
+    """Decode a received ASGI frame; returns None if it is not a valid object"""
+    try:
+        if message.get("bytes") is not None:
+            if msgpack is None:
+                return None
+            data = msgpack.unpackb(message["bytes"])
+        else:
+            data = json.loads(message.get("text") or "")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def negotiate_subprotocol(websocket: WebSocket):
+    """Pick the frame format from the subprotocols the client offered"""
+    offered = websocket.scope.get("subprotocols") or []
+    if MSGPACK_SUBPROTOCOL in offered and msgpack is not None:
+        return FRAME_FORMAT_MSGPACK, MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return FRAME_FORMAT_JSON, JSON_SUBPROTOCOL
+    return FRAME_FORMAT_JSON, None
+
+
+class ClientConnection:
+    """A single subscriber socket with its own outbound queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, tournament_id: str, max_queue: int,
+                 frame_format: str = FRAME_FORMAT_JSON):
+        self.websocket = websocket
+        self.tournament_id = tournament_id
+        self.frame_format = frame_format
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer_task: asyncio.Task = None
+        self.last_seen = time.monotonic()
+
+    def start(self, on_failure):
+        self.writer_task = asyncio.create_task(self._writer(on_failure))
+
+    async def receive(self) -> Optional[dict]:
+        """Wait for the next client frame; any frame counts as a sign of life"""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        self.last_seen = time.monotonic()
+        return decode_frame(message)
+
+    def enqueue(self, frame: Frame) -> bool:
+        """Queue a frame without waiting; returns False if the client is too far behind"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _writer(self, on_failure):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            on_failure(self, f"send failed: {e}")
+
+    def stop(self):
+        if self.writer_task and not self.writer_task.done():
+            self.writer_task.cancel()
+
+
+Deliver = Callable[[str, dict], None]
+
+
+class InMemoryBroadcastBackend:
+    """Single-process bus: publishing delivers straight to this worker's sockets"""
+
+    def __init__(self):
+        self._deliver: Deliver = None
+        self._sequences: Dict[str, int] = {}
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def next_sequence(self, tournament_id: str) -> int:
+        seq = self._sequences.get(tournament_id, 0) + 1
+        self._sequences[tournament_id] = seq
+        return seq
+
+    async def current_sequence(self, tournament_id: str) -> int:
+        return self._sequences.get(tournament_id, 0)
+
+    async def publish(self, tournament_id: str, message: dict):
+        self._deliver(tournament_id, message)
+
+
+class MongoBroadcastBackend:
+    """
+    Multi-process bus on a MongoDB capped collection.
+
+    Every worker appends published messages to the collection and tails it with
+    a tailable cursor, delivering messages from other workers to its own
+    sockets. A worker's own messages are delivered locally without the round
+    trip through Mongo.
+    """
+
+    # How far back to rewind when a dead tailable cursor has to be reopened.
+    # ObjectIds from different processes are only roughly ordered, so we rewind
+    # a little and skip anything already seen.
+    RESUME_SKEW = timedelta(seconds=5)
+
+    def __init__(self, db, collection_name: str = "broadcast_bus", size_bytes: int = 16 * 1024 * 1024):
+        self.db = db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.collection = db[collection_name]
+        self.sequences = db["broadcast_sequences"]
+        self.origin = uuid.uuid4().hex
+        self._deliver: Deliver = None
+        self._tail_task: asyncio.Task = None
+        self._seen_ids = deque(maxlen=4096)
+        self._seen_set = set()
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # Already created by another worker
+        # A tailable cursor on an empty capped collection dies immediately
+        await self.collection.insert_one({"origin": self.origin, "type": "worker_started"})
+        self._tail_task = asyncio.create_task(self._tail(ObjectId.from_datetime(datetime.utcnow())))
+
+    async def stop(self):
+        if self._tail_task:
+            self._tail_task.cancel()
+            try:
+                await self._tail_task
+            except asyncio.CancelledError:
+                pass
+
+    async def next_sequence(self, tournament_id: str) -> int:
+        counter = await self.sequences.find_one_and_update(
+            {"_id": tournament_id},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    async def current_sequence(self, tournament_id: str) -> int:
+        counter = await self.sequences.find_one({"_id": tournament_id})
+        return counter["seq"] if counter else 0
+
+    async def publish(self, tournament_id: str, message: dict):
+        self._deliver(tournament_id, message)
+        await self.collection.insert_one({
+            "origin": self.origin,
+            "tournament_id": tournament_id,
+            "message": message
+        })
+
+    def _mark_seen(self, doc_id) -> bool:
+        if doc_id in self._seen_set:
+            return False
+        if len(self._seen_ids) == self._seen_ids.maxlen:
+            self._seen_set.discard(self._seen_ids[0])
+        self._seen_ids.append(doc_id)
+        self._seen_set.add(doc_id)
+        return True
+
+    async def _tail(self, floor: ObjectId):
+        while True:
+            cursor = self.collection.find(
+                {"_id": {"$gte": floor}},
+                cursor_type=CursorType.TAILABLE_AWAIT
+            )
+            try:
+                while cursor.alive:
+                    async for doc in cursor:
+                        if not self._mark_seen(doc["_id"]):
+                            continue
+                        floor = ObjectId.from_datetime(doc["_id"].generation_time - self.RESUME_SKEW)
+                        if doc.get("origin") == self.origin or "tournament_id" not in doc:
+                            continue
+                        self._deliver(doc["tournament_id"], doc["message"])
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Broadcast bus cursor failed, reopening: {e}")
+            except Exception:
+                logger.exception("Failed to deliver message from broadcast bus")
+            await asyncio.sleep(1)
+
+
+class ConnectionManager:
+    def __init__(self, send_queue_size: int = 64, backend=None, replay_buffer_size: int = 256,
+                 heartbeat_interval: float = 20, idle_timeout: float = 60, reorder_timeout: float = 2):
+        self.send_queue_size = send_queue_size
+        self.backend = backend or InMemoryBroadcastBackend()
+        self.replay_buffer_size = replay_buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.reorder_timeout = reorder_timeout
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self.replay_buffers: Dict[str, Deque[dict]] = {}
+        # Last time each replay buffer saw an event or lost its last socket
+        self.room_activity: Dict[str, float] = {}
+        self.stats = Counter(opened=0, closed=0, evicted=0)
+        self._heartbeat_task: asyncio.Task = None
+        # Latest coalesced message per tournament and the task that will flush it
+        self._coalesced: Dict[str, dict] = {}
+        self._coalesce_tasks: Dict[str, asyncio.Task] = {}
+        # Per room: the next sequence number to deliver, events that arrived
+        # ahead of it, and the task that gives up waiting for the gap
+        self._next_seq: Dict[str, int] = {}
+        self._held: Dict[str, Dict[int, dict]] = {}
+        self._reorder_tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        await self.backend.start(self.deliver_local)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        for task in self._reorder_tasks.values():
+            task.cancel()
+        for tournament_id in list(self._coalesced):
+            await self._flush_coalesced(tournament_id)
+        await self.backend.stop()
+
+    async def connect(self, websocket: WebSocket, tournament_id: str,
+                      since: Optional[int] = None, first_frame: Optional[dict] = None) -> ClientConnection:
+        """
+        Register a socket. `first_frame` (e.g. a snapshot) is queued before any
+        live event, then buffered events after `since` are replayed.
+        """
+        frame_format, subprotocol = negotiate_subprotocol(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        connection = ClientConnection(websocket, tournament_id, self.send_queue_size, frame_format)
+        if first_frame is not None:
+            connection.enqueue(FRAME_ENCODERS[frame_format](first_frame))
+        # No awaits from here on: nothing can be broadcast between registering
+        # the socket and replaying the buffer, so no event is lost or doubled
+        if tournament_id not in self.active_connections:
+            self.active_connections[tournament_id] = []
+        self.active_connections[tournament_id].append(connection)
+        self.watch_room(tournament_id)
+        if since is not None:
+            self._next_seq.setdefault(tournament_id, since + 1)
+        self.stats["opened"] += 1
+        connection.start(self.evict)
+        if since is not None:
+            self.replay(connection, since)
+        return connection
+
+    def watch_room(self, tournament_id: str):
+        """
+        Start buffering the room's events on this worker. Called before reading
+        the sequence a new socket starts from, so nothing published while its
+        snapshot is built can slip past both the snapshot and the replay.
+        """
+        if tournament_id not in self.replay_buffers:
+            self.replay_buffers[tournament_id] = deque(maxlen=self.replay_buffer_size)
+        self.room_activity[tournament_id] = time.monotonic()
+
+    def can_resume(self, tournament_id: str, since: int) -> bool:
+        """True if every event after `since` is still in this worker's replay buffer"""
+        buffer = self.replay_buffers.get(tournament_id)
+        if not buffer or not buffer[0]["seq"] <= since + 1 <= buffer[-1]["seq"] + 1:
+            return False
+        # A gap that was skipped cannot be replayed
+        expected = since + 1
+        for message in buffer:
+            if message["seq"] < expected:
+                continue
+            if message["seq"] != expected:
+                return False
+            expected += 1
+        return True
+
+    async def current_sequence(self, tournament_id: str) -> int:
+        return await self.backend.current_sequence(tournament_id)
+
+    def replay(self, connection: ClientConnection, since: int):
+        """Queue the buffered events after `since` for a single connection"""
+        buffer = self.replay_buffers.get(connection.tournament_id)
+        if not buffer:
+            return
+        encode = FRAME_ENCODERS[connection.frame_format]
+        for message in buffer:
+            if message["seq"] > since and not connection.enqueue(encode(message)):
+                self._drop_slow_consumer(connection)
+                return
+
+    def send_to(self, connection: ClientConnection, message: dict):
+        """Queue a message for a single connection, e.g. a command ack"""
+        if not connection.enqueue(FRAME_ENCODERS[connection.frame_format](message)):
+            self._drop_slow_consumer(connection)
+
+    def disconnect(self, connection: ClientConnection):
+        """Forget a socket the client closed"""
+        if self._remove(connection):
+            self.stats["closed"] += 1
+
+    def evict(self, connection: ClientConnection, reason: str, close_code: int = None):
+        """Drop a socket from the server side and close it if it is still open"""
+        if not self._remove(connection):
+            return
+        self.stats["evicted"] += 1
+        logger.info(f"Evicted WebSocket in tournament {connection.tournament_id}: {reason}")
+        if close_code is not None:
+            asyncio.create_task(self._close(connection.websocket, close_code))
+
+    def _remove(self, connection: ClientConnection) -> bool:
+        connection.stop()
+        tournament_id = connection.tournament_id
+        connections = self.active_connections.get(tournament_id)
+        if not connections or connection not in connections:
+            return False
+        connections.remove(connection)
+        if not connections:
+            del self.active_connections[tournament_id]
+            self.room_activity[tournament_id] = time.monotonic()
+        return True
+
+    def _drop_slow_consumer(self, connection: ClientConnection):
+        self.evict(
+            connection,
+            f"slow consumer ({connection.queue.qsize()} frames behind)",
+            SLOW_CONSUMER_CLOSE_CODE
+        )
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("WebSocket heartbeat sweep failed")
+
+    def sweep(self):
+        """Ping live sockets, evict idle ones and free the buffers of empty rooms"""
+        now = time.monotonic()
+        frames: Dict[str, Frame] = {}
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                if now - connection.last_seen > self.idle_timeout:
+                    self.evict(connection, "idle timeout", IDLE_CLOSE_CODE)
+                    continue
+                frame = frames.get(connection.frame_format)
+                if frame is None:
+                    frame = frames[connection.frame_format] = FRAME_ENCODERS[connection.frame_format]({"type": "ping"})
+                if not connection.enqueue(frame):
+                    self._drop_slow_consumer(connection)
+
+        # Keep an empty room's buffer around briefly so a quick reconnect can resume
+        for tournament_id, last_activity in list(self.room_activity.items()):
+            if tournament_id in self.active_connections:
+                continue
+            if now - last_activity > self.idle_timeout:
+                self.replay_buffers.pop(tournament_id, None)
+                self._next_seq.pop(tournament_id, None)
+                self._held.pop(tournament_id, None)
+                task = self._reorder_tasks.pop(tournament_id, None)
+                if task is not None:
+                    task.cancel()
+                del self.room_activity[tournament_id]
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "active_sockets": sum(len(connections) for connections in self.active_connections.values()),
+            "active_rooms": len(self.active_connections),
+            "replay_buffers": len(self.replay_buffers)
+        }
+
+    async def broadcast_to_tournament(self, tournament_id: str, message: dict, coalesce_window: float = 0):
+        """
+        Publish a message to every subscriber of the tournament, on any worker.
+
+        With a `coalesce_window` (seconds) the message only replaces whatever is
+        pending for the tournament and goes out when the window closes. Any other
+        message flushes the pending one first, so ordering is preserved.
+        """
+        if coalesce_window > 0:
+            self._coalesced[tournament_id] = message
+            if tournament_id not in self._coalesce_tasks:
+                self._coalesce_tasks[tournament_id] = asyncio.create_task(
+                    self._flush_after(tournament_id, coalesce_window)
+                )
+            return
+        await self._flush_coalesced(tournament_id)
+        await self._publish(tournament_id, message)
+
+    async def _flush_after(self, tournament_id: str, window: float):
+        await asyncio.sleep(window)
+        self._coalesce_tasks.pop(tournament_id, None)
+        try:
+            await self._flush_coalesced(tournament_id)
+        except Exception:
+            logger.exception(f"Failed to flush coalesced message for tournament {tournament_id}")
+
+    async def _flush_coalesced(self, tournament_id: str):
+        task = self._coalesce_tasks.pop(tournament_id, None)
+        if task is not None:
+            task.cancel()
+        message = self._coalesced.pop(tournament_id, None)
+        if message is not None:
+            await self._publish(tournament_id, message)
+
+    async def _publish(self, tournament_id: str, message: dict):
+        """Stamp a message with the next sequence number and hand it to the backend"""
+        seq = await self.backend.next_sequence(tournament_id)
+        await self.backend.publish(tournament_id, {**message, "seq": seq})
+
+    def deliver_local(self, tournament_id: str, message: dict):
+        """Queue a message for every socket in the room held by this process, in sequence order"""
+        seq = message.get("seq")
+        if seq is None:
+            self._fan_out(tournament_id, message)
+            return
+        # Only buffer rooms this worker serves (or served very recently); with a
+        # shared bus every worker sees every tournament's events
+        if tournament_id not in self.replay_buffers:
+            if not self.active_connections.get(tournament_id):
+                return
+            self.watch_room(tournament_id)
+        self.room_activity[tournament_id] = time.monotonic()
+
+        expected = self._next_seq.get(tournament_id)
+        if expected is None or seq == expected:
+            self._release(tournament_id, message)
+            self._release_held(tournament_id)
+        elif seq > expected:
+            self._held.setdefault(tournament_id, {})[seq] = message
+            if tournament_id not in self._reorder_tasks:
+                self._reorder_tasks[tournament_id] = asyncio.create_task(self._skip_gap_after(tournament_id))
+        else:
+            # Arrived after its gap was skipped: clients have resynced past it,
+            # but the buffer keeps it so replays stay complete
+            self._insert_late(tournament_id, message)
+
+    def _release(self, tournament_id: str, message: dict):
+        self.replay_buffers[tournament_id].append(message)
+        self._next_seq[tournament_id] = message["seq"] + 1
+        self._fan_out(tournament_id, message)
+
+    def _release_held(self, tournament_id: str):
+        """Deliver held events that are now next in line"""
+        held = self._held.get(tournament_id)
+        while held and self._next_seq[tournament_id] in held:
+            self._release(tournament_id, held.pop(self._next_seq[tournament_id]))
+        if not held:
+            self._held.pop(tournament_id, None)
+            task = self._reorder_tasks.pop(tournament_id, None)
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+
+    async def _skip_gap_after(self, tournament_id: str):
+        await asyncio.sleep(self.reorder_timeout)
+        self._reorder_tasks.pop(tournament_id, None)
+        held = self._held.get(tournament_id)
+        if not held:
+            return
+        missing = self._next_seq.get(tournament_id)
+        logger.warning(f"Skipping missing events {missing}..{min(held) - 1} in tournament {tournament_id}")
+        self._next_seq[tournament_id] = min(held)
+        self._release_held(tournament_id)
+        if self._held.get(tournament_id) and tournament_id not in self._reorder_tasks:
+            self._reorder_tasks[tournament_id] = asyncio.create_task(self._skip_gap_after(tournament_id))
+
+    def _insert_late(self, tournament_id: str, message: dict):
+        buffer = self.replay_buffers[tournament_id]
+        seq = message["seq"]
+        if any(buffered["seq"] == seq for buffered in buffer):
+            return
+        index = len(buffer)
+        while index > 0 and buffer[index - 1]["seq"] > seq:
+            index -= 1
+        if len(buffer) == buffer.maxlen:
+            if index == 0:
+                return  # Older than everything a full buffer still holds
+            buffer.popleft()
+            index -= 1
+        buffer.insert(index, message)
+
+    def _fan_out(self, tournament_id: str, message: dict):
+        connections = self.active_connections.get(tournament_id)
+        if not connections:
+            return
+        # Encode lazily, at most once per format in use in this room
+        frames: Dict[str, Frame] = {}
+        for connection in list(connections):
+            frame = frames.get(connection.frame_format)
+            if frame is None:
+                frame = frames[connection.frame_format] = FRAME_ENCODERS[connection.frame_format](message)
+            if not connection.enqueue(frame):
+                self._drop_slow_consumer(connection)
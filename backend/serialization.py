@@ -0,0 +1,75 @@
+"""
+Single-pass response serialization for read routes.
+
+Returning `Model(**doc)` from a route with a `response_model` validates every
+document twice (once in the route, once by FastAPI) before encoding it with
+the standard json module. Documents read back from Mongo were written by this
+app through the same models, so read routes instead project just the model's
+fields, fill in defaults for fields added after a document was written, and
+encode the plain dicts with orjson in one pass.
+
+History endpoints can also stream NDJSON (one document per line) straight
+from the Motor cursor, so exporting a long history never holds it all in
+memory: documents are fetched and written in batches of `STREAM_BATCH_SIZE`.
+"""
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Type
+
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection returning exactly the model's fields"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+@lru_cache(maxsize=None)
+def model_defaults(model: Type[BaseModel]) -> Dict[str, object]:
+    """Static defaults of optional fields (generated ones such as ids are never missing)"""
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+
+def document_response(model: Type[BaseModel], document: dict, headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse({**model_defaults(model), **document}, headers=headers)
+
+
+def documents_response(model: Type[BaseModel], documents: List[dict], headers: Optional[dict] = None) -> ORJSONResponse:
+    defaults = model_defaults(model)
+    return ORJSONResponse([{**defaults, **document} for document in documents], headers=headers)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _ndjson_chunks(model: Type[BaseModel], cursor, batch_size: int) -> AsyncIterator[bytes]:
+    defaults = model_defaults(model)
+    lines = []
+    try:
+        async for document in cursor.batch_size(batch_size):
+            lines.append(orjson.dumps({**defaults, **document}))
+            if len(lines) >= batch_size:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        # Also runs when the client disconnects mid-stream
+        await cursor.close()
+
+
+def ndjson_response(model: Type[BaseModel], cursor, headers: Optional[dict] = None,
+                    batch_size: int = STREAM_BATCH_SIZE) -> StreamingResponse:
+    """Stream the documents of a Motor cursor as NDJSON, one batch per chunk"""
+    return StreamingResponse(_ndjson_chunks(model, cursor, batch_size), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -1,35 +1,41 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
 from enum import Enum
 import asyncio
-import json
 import random
 import string
+from collections import OrderedDict
 from ryder_cup_players import RYDER_CUP_PLAYERS
+from realtime import ConnectionManager, InMemoryBroadcastBackend, MongoBroadcastBackend
+from auction_engine import AuctionEngine, BidWriter
+from lot_scheduler import LotScheduler
+from pagination import decode_tournament_cursor, encode_tournament_cursor
+from auction_queue import auction_complete, next_lot
+from idempotency import IdempotencyStore
+from indexes import ensure_indexes
+from team_catalog import TeamCatalog, catalog_team_id, catalog_version, sync_catalog
+from serialization import document_response, documents_response, model_projection, ndjson_response, wants_ndjson
+import projections
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 def generate_join_code():
-    """Generate a unique 6-character join code"""
+    """Generate a random 6-character join code (uniqueness is enforced by the join_code index)"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
-async def ensure_unique_join_code(db):
-    """Ensure the generated join code is unique"""
-    while True:
-        code = generate_join_code()
-        existing = await db.tournaments.find_one({"join_code": code})
-        if not existing:
-            return code
+JOIN_CODE_ATTEMPTS = 5
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
@@ -42,30 +48,35 @@ app = FastAPI(title="Friends of PIFA API")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+# WebSocket connection manager. Use BROADCAST_BACKEND=mongo when running
+# more than one uvicorn worker so every worker sees every tournament event.
+def create_broadcast_backend():
+    backend_name = os.environ.get('BROADCAST_BACKEND', 'memory')
+    if backend_name == 'mongo':
+        return MongoBroadcastBackend(db)
+    if backend_name == 'memory':
+        return InMemoryBroadcastBackend()
+    raise ValueError(f"Unknown BROADCAST_BACKEND: {backend_name}")
 
-    async def connect(self, websocket: WebSocket, tournament_id: str):
-        await websocket.accept()
-        if tournament_id not in self.active_connections:
-            self.active_connections[tournament_id] = []
-        self.active_connections[tournament_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, tournament_id: str):
-        if tournament_id in self.active_connections:
-            self.active_connections[tournament_id].remove(websocket)
+manager = ConnectionManager(
+    send_queue_size=int(os.environ.get('WS_SEND_QUEUE_SIZE', '64')),
+    backend=create_broadcast_backend(),
+    heartbeat_interval=float(os.environ.get('WS_HEARTBEAT_INTERVAL', '20')),
+    idle_timeout=float(os.environ.get('WS_IDLE_TIMEOUT', '60'))
+)
 
-    async def broadcast_to_tournament(self, tournament_id: str, message: dict):
-        if tournament_id in self.active_connections:
-            for connection in self.active_connections[tournament_id]:
-                try:
-                    await connection.send_text(json.dumps(message))
-                except:
-                    pass
+# In-memory auction engine with write-behind bid persistence. It must be the
+# only writer for an auction, so by default it is only on in single-process
+# (in-memory broadcast) deployments.
+bid_writer = BidWriter(db)
+auction_engine = AuctionEngine(db, bid_writer)
+USE_AUCTION_ENGINE = os.environ.get(
+    'AUCTION_ENGINE',
+    'memory' if os.environ.get('BROADCAST_BACKEND', 'memory') == 'memory' else 'off'
+) == 'memory'
 
-manager = ConnectionManager()
+# Stored responses for retried bid/join/chat requests that carry an Idempotency-Key
+idempotency = IdempotencyStore(db)
 
 # Enums
 class TournamentStatus(str, Enum):
@@ -116,11 +127,37 @@ class Tournament(BaseModel):
     prize_pool: int = 0  # in pence
     current_team_id: Optional[str] = None
     bid_end_time: Optional[datetime] = None
+    current_high_bid: Optional[int] = None  # Highest accepted bid on the current lot
+    current_high_bidder_id: Optional[str] = None
+    settled_team_ids: List[str] = []  # Lots that closed with a winning bid
+    pending_settlement: Optional[Dict[str, Any]] = None  # Closed lot not yet applied to the winner's squad
+    version: int = 0  # Bumped after every change to the tournament or its squads, bids and chat
     participants: List[str] = []
     teams: List[str] = []
+    # Auction queue: shuffled once at start, walked with a cursor; unbid lots wait in reauction_queue
+    auction_order: List[str] = []
+    auction_cursor: int = 0  # Index in auction_order of the next lot to open
+    reauction_queue: List[str] = []
     join_code: str = Field(default="")  # 6-character join code
+    bid_coalesce_ms: int = 0  # Merge new_bid broadcasts within this window; 0 sends every bid
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class TournamentSummary(BaseModel):
+    """What the lobby shows for a tournament - no team lists or auction state"""
+    id: str
+    name: str
+    admin_id: str
+    competition_type: CompetitionType
+    status: TournamentStatus = TournamentStatus.PENDING
+    budget_per_user: int = 500_000_000
+    teams_per_user: int
+    minimum_bid: int = 1_000_000
+    entry_fee: int = 0
+    prize_pool: int = 0
+    participants: List[str] = []
+    join_code: str = ""
+    created_at: datetime
+
 class TournamentCreate(BaseModel):
     name: str
     competition_type: CompetitionType
@@ -128,6 +165,7 @@ class TournamentCreate(BaseModel):
     minimum_bid: int = 1_000_000
     entry_fee: int = 0
     auction_start_time: Optional[datetime] = None
+    bid_coalesce_ms: int = Field(default=0, ge=0, le=1000)
 
 class Bid(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -237,30 +275,137 @@ EUROPA_LEAGUE_TEAMS = [
     {"name": "HJK Helsinki", "country": "Finland"}
 ]
 
-# Initialize teams in database
-async def initialize_teams():
-    teams_collection = db.teams
-    
-    # Clear existing teams
-    await teams_collection.delete_many({})
-    
-    # Add Champions League teams
-    for team_data in CHAMPIONS_LEAGUE_TEAMS:
-        team = Team(
-            name=team_data["name"],
-            country=team_data["country"],
-            competition=CompetitionType.CHAMPIONS_LEAGUE
-        )
-        await teams_collection.insert_one(team.dict())
-    
-    # Add Europa League teams
-    for team_data in EUROPA_LEAGUE_TEAMS:
-        team = Team(
-            name=team_data["name"],
-            country=team_data["country"],
-            competition=CompetitionType.EUROPA_LEAGUE
+def build_ryder_cup_catalog() -> List[dict]:
+    return [
+        Team(
+            id=catalog_team_id(CompetitionType.RYDER_CUP.value, player_data["name"]),
+            name=player_data["name"],
+            country=player_data["country"],
+            competition=CompetitionType.RYDER_CUP,
+            # Store golf-specific data in a flexible way
+            world_ranking=player_data.get("world_ranking"),
+            team=player_data.get("team"),  # Europe or USA
+            major_wins=player_data.get("major_wins", 0),
+            ryder_cup_appearances=player_data.get("ryder_cup_appearances", 0)
+        ).dict()
+        for player_data in RYDER_CUP_PLAYERS
+    ]
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names `etag`"""
+    tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in tags or "*" in tags
+
+# Tournament reads are cached by version: every write bumps `version` only
+# after it has finished, so a tag never claims data that is not there yet
+TOURNAMENT_CACHE_CONTROL = "private, no-cache"
+
+def version_etag(resource: str, version: int) -> str:
+    return f'"{resource}-v{version}"'
+
+async def bump_version(tournament_id: str):
+    """Mark a tournament as changed after a write to its squads, bids or chat"""
+    await db.tournaments.update_one({"id": tournament_id}, {"$inc": {"version": 1}})
+
+def version_headers(resource: str, version: int) -> dict:
+    return {"ETag": version_etag(resource, version), "Cache-Control": TOURNAMENT_CACHE_CONTROL}
+
+async def sub_resource_headers(tournament_id: str, resource: str) -> Optional[dict]:
+    """Caching headers for a tournament sub-resource, from the tournament version alone"""
+    tournament = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_VERSION)
+    if not tournament:
+        return None
+    return version_headers(resource, tournament.get("version", 0))
+
+# Bid and chat history: a JSON array holds at most HISTORY_LIMIT rows, while
+# clients that send `Accept: application/x-ndjson` get the whole history (or
+# `limit` rows) streamed from the cursor. `since` returns rows newer than it.
+# A JSON page that stops short of the end carries X-Next-Since; pass it back as
+# `since` for the rest.
+HISTORY_LIMIT = 1000
+NEXT_SINCE_HEADER = "X-Next-Since"
+
+async def history_headers(tournament_id: str, resource: str, stream: bool) -> Optional[dict]:
+    headers = await sub_resource_headers(tournament_id, f"{resource}.ndjson" if stream else resource)
+    if headers:
+        headers["Vary"] = "Accept"
+    return headers
+
+def history_filter(tournament_id: str, since: Optional[datetime]) -> dict:
+    query = {"tournament_id": tournament_id}
+    if since:
+        query["timestamp"] = {"$gt": since}
+    return query
+
+async def history_response(model, cursor, stream: bool, limit: Optional[int], headers: Optional[dict]):
+    if stream:
+        return ndjson_response(model, cursor.limit(limit or 0), headers)
+    if limit and limit > HISTORY_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit above {HISTORY_LIMIT} needs a streamed response (Accept: application/x-ndjson)"
         )
-        await teams_collection.insert_one(team.dict())
+    limit = limit or HISTORY_LIMIT
+    # One extra row tells us whether the history goes on
+    rows = await cursor.limit(limit + 1).to_list(limit + 1)
+    if len(rows) > limit:
+        # `since` is exclusive, so end the page before the timestamp it was cut in
+        cut = rows[limit]["timestamp"]
+        rows = [row for row in rows[:limit] if row["timestamp"] < cut]
+        if not rows:
+            raise HTTPException(
+                status_code=400,
+                detail=f"More than {limit} rows share one timestamp; use a streamed response (Accept: application/x-ndjson)"
+            )
+        headers = {**(headers or {}), NEXT_SINCE_HEADER: rows[-1]["timestamp"].isoformat()}
+    return documents_response(model, rows, headers)
+
+# In-memory copy of the teams collection served by GET /teams
+team_catalog = TeamCatalog()
+TEAM_CATALOG_CHECK_SECONDS = float(os.environ.get('TEAM_CATALOG_CHECK_SECONDS', '5'))
+team_catalog_checked = 0.0
+
+async def reload_team_catalog():
+    global team_catalog
+    # Version before rows: a sync landing in between only costs one extra reload
+    version = await catalog_version(db.catalog_versions)
+    teams = await db.teams.find({}, model_projection(Team)).to_list(None)
+    # Keep competition as the plain string so the catalog can be keyed by it
+    team_catalog = TeamCatalog(
+        [{**Team(**team).dict(), "competition": team["competition"]} for team in teams], version
+    )
+
+async def refresh_team_catalog(competition: Optional[str]):
+    """
+    Reload if another worker synced the catalog. The stored version is checked
+    at most every TEAM_CATALOG_CHECK_SECONDS, and at once for a competition this
+    worker has no teams for.
+    """
+    global team_catalog_checked
+    now = asyncio.get_running_loop().time()
+    known = competition is None or competition in team_catalog.by_competition
+    if known and now - team_catalog_checked < TEAM_CATALOG_CHECK_SECONDS:
+        return
+    team_catalog_checked = now
+    if await catalog_version(db.catalog_versions) != team_catalog.version:
+        await reload_team_catalog()
+
+# Sync the team catalog in one bulk write - team IDs survive restarts
+async def initialize_teams():
+    catalog = []
+    for competition, teams in (
+        (CompetitionType.CHAMPIONS_LEAGUE, CHAMPIONS_LEAGUE_TEAMS),
+        (CompetitionType.EUROPA_LEAGUE, EUROPA_LEAGUE_TEAMS)
+    ):
+        for team_data in teams:
+            catalog.append(Team(
+                id=catalog_team_id(competition.value, team_data["name"]),
+                name=team_data["name"],
+                country=team_data["country"],
+                competition=competition
+            ).dict())
+    await sync_catalog(db.teams, db.catalog_versions, catalog)
+    await reload_team_catalog()
 
 # API Routes
 @api_router.get("/")
@@ -271,262 +416,411 @@ async def root():
 @api_router.post("/users", response_model=User)
 async def create_user(user: UserCreate):
     # Check if user already exists
-    existing_user = await db.users.find_one({"email": user.email})
+    existing_user = await db.users.find_one({"email": user.email}, model_projection(User))
     if existing_user:
         return User(**existing_user)
     
     user_obj = User(**user.dict())
-    await db.users.insert_one(user_obj.dict())
+    try:
+        await db.users.insert_one(user_obj.dict())
+    except DuplicateKeyError:
+        # Created by a concurrent request with the same email (unique index)
+        return User(**await db.users.find_one({"email": user.email}, model_projection(User)))
     return user_obj
 
 @api_router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, model_projection(User))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return document_response(User, user)
 
 # Teams routes
 @api_router.get("/teams", response_model=List[Team])
-async def get_teams(competition: Optional[CompetitionType] = None):
-    query = {}
-    if competition:
-        query["competition"] = competition
-    teams = await db.teams.find(query).to_list(1000)
-    return [Team(**team) for team in teams]
+async def get_teams(request: Request, competition: Optional[CompetitionType] = None):
+    """Served from the in-memory catalog; clients revalidate with If-None-Match and get 304s"""
+    competition = competition.value if competition else None
+    await refresh_team_catalog(competition)
+    body, etag = team_catalog.response(competition)
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.post("/initialize-ryder-cup")
 async def initialize_ryder_cup_players():
     """Initialize Ryder Cup players in the database"""
-    
-    # Check if players already exist
-    existing_players = await db.teams.find({"competition": "ryder_cup"}).to_list(1000)
-    if existing_players:
+    players = build_ryder_cup_catalog()
+    result = await sync_catalog(db.teams, db.catalog_versions, players)
+    await reload_team_catalog()
+    if not result.upserted_count:
         return {
             "message": "Ryder Cup players already initialized", 
-            "existing_count": len(existing_players)
+            "existing_count": len(players)
         }
     
-    # Insert all Ryder Cup players
-    players_to_insert = []
-    for player_data in RYDER_CUP_PLAYERS:
-        player = Team(
-            id=str(uuid.uuid4()),
-            name=player_data["name"],
-            country=player_data["country"],
-            competition=player_data["competition"],
-            # Store golf-specific data in a flexible way
-            world_ranking=player_data.get("world_ranking"),
-            team=player_data.get("team"),  # Europe or USA
-            major_wins=player_data.get("major_wins", 0),
-            ryder_cup_appearances=player_data.get("ryder_cup_appearances", 0)
-        )
-        players_to_insert.append(player.dict())
-    
-    await db.teams.insert_many(players_to_insert)
-    
     return {
         "message": "Ryder Cup players initialized successfully",
-        "players_added": len(players_to_insert)
+        "players_added": result.upserted_count
     }
 
 # Tournament routes
 @api_router.post("/tournaments", response_model=Tournament)
 async def create_tournament(tournament: TournamentCreate, admin_id: str):
     # Get teams based on competition type
-    teams = await db.teams.find({"competition": tournament.competition_type}).to_list(1000)
+    teams = await db.teams.find({"competition": tournament.competition_type}, projections.TEAM_IDS).to_list(1000)
     team_ids = [team["id"] for team in teams]
     
-    # Generate unique join code
-    join_code = await ensure_unique_join_code(db)
-    
     tournament_obj = Tournament(
         **tournament.dict(),
         admin_id=admin_id,
         participants=[admin_id],
-        teams=team_ids,
-        join_code=join_code
+        teams=team_ids
     )
-    await db.tournaments.insert_one(tournament_obj.dict())
+    
+    # Insert with a random join code and let the unique index catch the rare
+    # collision - no lookup before the write, and no check-then-insert race
+    for _ in range(JOIN_CODE_ATTEMPTS):
+        tournament_obj.join_code = generate_join_code()
+        try:
+            await db.tournaments.insert_one(tournament_obj.dict())
+            break
+        except DuplicateKeyError as e:
+            if "join_code" not in (e.details or {}).get("keyPattern", {}):
+                raise
+    else:
+        raise HTTPException(status_code=503, detail="Could not allocate a join code, please try again")
     
     # Create squad for admin user
-    admin_squad = Squad(tournament_id=tournament_obj.id, user_id=admin_id)
-    await db.squads.insert_one(admin_squad.dict())
+    await create_squad(tournament_obj.id, admin_id)
     
     return tournament_obj
 
-@api_router.get("/tournaments", response_model=List[Tournament])
-async def get_tournaments():
-    tournaments = await db.tournaments.find().to_list(1000)
-    return [Tournament(**tournament) for tournament in tournaments]
+# Read routes return stored documents as-is (see serialization.py); the
+# response_model only documents the shape
+TOURNAMENT_PAGE_SIZE = 50
+MAX_TOURNAMENT_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+@api_router.get("/tournaments", response_model=List[TournamentSummary])
+async def get_tournaments(
+    user_id: Optional[str] = None,
+    status: Optional[TournamentStatus] = None,
+    competition_type: Optional[CompetitionType] = None,
+    limit: int = Query(TOURNAMENT_PAGE_SIZE, ge=1, le=MAX_TOURNAMENT_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Newest tournaments first, optionally only those `user_id` takes part in or
+    with a given status or competition. When there are more, the response has
+    an X-Next-Cursor header; pass it back as `cursor` for the next page.
+    """
+    query = {}
+    if user_id:
+        query["participants"] = user_id
+    if status:
+        query["status"] = status.value
+    if competition_type:
+        query["competition_type"] = competition_type.value
+    if cursor:
+        query.update(decode_tournament_cursor(cursor))
+    
+    # One extra row tells us whether there is a next page
+    tournaments = await db.tournaments.find(
+        query, model_projection(TournamentSummary)
+    ).sort([("created_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+    headers = None
+    if len(tournaments) > limit:
+        tournaments = tournaments[:limit]
+        headers = {NEXT_CURSOR_HEADER: encode_tournament_cursor(tournaments[-1])}
+    return documents_response(TournamentSummary, tournaments, headers)
 
 @api_router.get("/tournaments/{tournament_id}", response_model=Tournament)
-async def get_tournament(tournament_id: str):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
+async def get_tournament(tournament_id: str, request: Request):
+    tournament = await db.tournaments.find_one({"id": tournament_id}, model_projection(Tournament))
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
-    return Tournament(**tournament)
+    headers = version_headers("tournament", tournament.get("version", 0))
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return document_response(Tournament, tournament, headers)
+
+async def broadcast_participant_joined(tournament_obj: Tournament, squad: Squad):
+    """Push the new participant and their empty squad to everyone in the room"""
+    auction_engine.invalidate(tournament_obj.id)
+    user = await db.users.find_one({"id": squad.user_id}, projections.USERNAME)
+    await manager.broadcast_to_tournament(tournament_obj.id, {
+        "type": "participant_joined",
+        "user_id": squad.user_id,
+        "username": user["username"] if user else "Unknown",
+        "squad": squad.dict(),
+        "prize_pool": tournament_obj.prize_pool
+    })
+
+MAX_PARTICIPANTS = 8
+
+async def add_participant(tournament: dict, user_id: str) -> Tournament:
+    """
+    Add a user to a tournament with one conditional update, so concurrent joins
+    cannot overwrite each other or push the tournament past the participant cap.
+    The squad is created afterwards, so a retry of a join that failed in between
+    only creates the squad.
+    """
+    updated = await db.tournaments.find_one_and_update(
+        {
+            "id": tournament["id"],
+            "participants": {"$ne": user_id},
+            f"participants.{MAX_PARTICIPANTS - 1}": {"$exists": False}
+        },
+        {"$addToSet": {"participants": user_id}, "$inc": {"prize_pool": tournament["entry_fee"]}},
+        projection=model_projection(Tournament),
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        updated = await db.tournaments.find_one({"id": tournament["id"]}, model_projection(Tournament))
+        if not updated or user_id not in updated.get("participants", []):
+            raise HTTPException(status_code=400, detail="Tournament full")
+        # A join that failed after adding the user left them without a squad;
+        # the retry finishes it instead of reporting a repeat join
+        if await db.squads.find_one({"tournament_id": tournament["id"], "user_id": user_id}, projections.EXISTS):
+            raise HTTPException(status_code=400, detail="Already joined")
+    
+    tournament_obj = Tournament(**updated)
+    squad = await create_squad(tournament_obj.id, user_id)
+    await bump_version(tournament_obj.id)
+    await broadcast_participant_joined(tournament_obj, squad)
+    return tournament_obj
+
+async def create_squad(tournament_id: str, user_id: str) -> Squad:
+    """Create the user's squad unless it already exists (unique on tournament_id + user_id)"""
+    squad = Squad(tournament_id=tournament_id, user_id=user_id)
+    try:
+        existing = await db.squads.find_one_and_update(
+            {"tournament_id": tournament_id, "user_id": user_id},
+            {"$setOnInsert": squad.dict()},
+            projection=model_projection(Squad),
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Lost an upsert race with a retry of the same join - the squad is there now
+        existing = await db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id}, model_projection(Squad))
+    return Squad(**existing)
 
 @api_router.post("/tournaments/{tournament_id}/join")
-async def join_tournament(tournament_id: str, user_id: str):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
+async def join_tournament(tournament_id: str, user_id: str, idempotency_key: Optional[str] = Header(None)):
+    return await idempotency.run(
+        f"join:{tournament_id}:{user_id}", idempotency_key,
+        lambda: _join_tournament(tournament_id, user_id)
+    )
+
+async def _join_tournament(tournament_id: str, user_id: str):
+    tournament = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_JOIN)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
-    tournament_obj = Tournament(**tournament)
-    if user_id in tournament_obj.participants:
-        raise HTTPException(status_code=400, detail="Already joined")
-    
-    if len(tournament_obj.participants) >= 8:
-        raise HTTPException(status_code=400, detail="Tournament full")
-    
-    tournament_obj.participants.append(user_id)
-    tournament_obj.prize_pool += tournament_obj.entry_fee
-    
-    await db.tournaments.update_one(
-        {"id": tournament_id},
-        {"$set": tournament_obj.dict()}
-    )
-    
-    # Create squad for user
-    squad = Squad(tournament_id=tournament_id, user_id=user_id)
-    await db.squads.insert_one(squad.dict())
+    await add_participant(tournament, user_id)
     
     return {"message": "Joined tournament successfully"}
 
 @api_router.post("/tournaments/join-by-code")
-async def join_tournament_by_code(join_code: str, user_id: str):
+async def join_tournament_by_code(join_code: str, user_id: str, idempotency_key: Optional[str] = Header(None)):
     """Join tournament using a join code"""
-    tournament = await db.tournaments.find_one({"join_code": join_code.upper()})
+    return await idempotency.run(
+        f"join-by-code:{user_id}", idempotency_key,
+        lambda: _join_tournament_by_code(join_code, user_id)
+    )
+
+async def _join_tournament_by_code(join_code: str, user_id: str):
+    tournament = await db.tournaments.find_one({"join_code": join_code.upper()}, projections.TOURNAMENT_JOIN)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found with that join code")
     
-    tournament_obj = Tournament(**tournament)
-    if user_id in tournament_obj.participants:
-        raise HTTPException(status_code=400, detail="Already joined")
-    
-    if len(tournament_obj.participants) >= 8:
-        raise HTTPException(status_code=400, detail="Tournament full")
-    
-    tournament_obj.participants.append(user_id)
-    tournament_obj.prize_pool += tournament_obj.entry_fee
-    
-    await db.tournaments.update_one(
-        {"id": tournament_obj.id},
-        {"$set": tournament_obj.dict()}
-    )
-    
-    # Create squad for user
-    squad = Squad(tournament_id=tournament_obj.id, user_id=user_id)
-    await db.squads.insert_one(squad.dict())
+    tournament_obj = await add_participant(tournament, user_id)
     
     return {"message": "Joined tournament successfully", "tournament": tournament_obj}
 
 @api_router.post("/tournaments/{tournament_id}/start-auction")
 async def start_auction(tournament_id: str, admin_id: str):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
+    tournament = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_START)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
-    tournament_obj = Tournament(**tournament)
-    if tournament_obj.admin_id != admin_id:
+    if tournament["admin_id"] != admin_id:
         raise HTTPException(status_code=403, detail="Only admin can start auction")
     
-    if len(tournament_obj.participants) < 2:
+    if len(tournament.get("participants", [])) < 2:
         raise HTTPException(status_code=400, detail="Need at least 2 participants")
     
-    # Randomly shuffle teams for auction
-    random.shuffle(tournament_obj.teams)
-    tournament_obj.status = TournamentStatus.AUCTION_ACTIVE
-    tournament_obj.current_team_id = tournament_obj.teams[0] if tournament_obj.teams else None
-    tournament_obj.bid_end_time = datetime.utcnow() + timedelta(minutes=2)  # 2 minutes per team
+    # Randomly shuffle teams once; the order is never rewritten, only walked with a cursor
+    auction_order = list(tournament.get("teams", []))
+    random.shuffle(auction_order)
+    status = TournamentStatus.AUCTION_ACTIVE
+    current_team_id = auction_order[0] if auction_order else None
+    bid_end_time = datetime.utcnow() + timedelta(minutes=2)  # 2 minutes per team
     
     await db.tournaments.update_one(
         {"id": tournament_id},
-        {"$set": tournament_obj.dict()}
+        {"$set": {
+            "status": status,
+            "current_team_id": current_team_id,
+            "bid_end_time": bid_end_time,
+            "current_high_bid": None,
+            "current_high_bidder_id": None,
+            "auction_order": auction_order,
+            "auction_cursor": 1,
+            "reauction_queue": [],
+            "settled_team_ids": []
+        }, "$inc": {"version": 1}}
     )
     
+    auction_engine.invalidate(tournament_id)
+    lot_scheduler.schedule(tournament_id, current_team_id, bid_end_time)
+    
     # Broadcast auction start
     await manager.broadcast_to_tournament(tournament_id, {
         "type": "auction_started",
-        "current_team_id": tournament_obj.current_team_id,
-        "bid_end_time": tournament_obj.bid_end_time.isoformat()
+        "status": status,
+        "current_team_id": current_team_id,
+        "bid_end_time": bid_end_time.isoformat()
     })
     
     return {"message": "Auction started"}
 
 # Bidding routes
 @api_router.get("/tournaments/{tournament_id}/bids", response_model=List[Bid])
-async def get_tournament_bids(tournament_id: str):
-    bids = await db.bids.find({"tournament_id": tournament_id}).to_list(1000)
-    return [Bid(**bid) for bid in bids]
+async def get_tournament_bids(tournament_id: str, request: Request, since: Optional[datetime] = None,
+                              limit: Optional[int] = Query(None, ge=1)):
+    # Queued engine bids bump the version when written, so flush before comparing
+    await bid_writer.flush(tournament_id)
+    stream = wants_ndjson(request)
+    headers = await history_headers(tournament_id, "bids", stream)
+    if headers and etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    cursor = db.bids.find(history_filter(tournament_id, since), model_projection(Bid)).sort("timestamp", 1)
+    return await history_response(Bid, cursor, stream, limit, headers)
 
-@api_router.post("/tournaments/{tournament_id}/bid")
-async def place_bid(tournament_id: str, user_id: str, amount: int):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
-    if not tournament:
-        raise HTTPException(status_code=404, detail="Tournament not found")
-    
-    tournament_obj = Tournament(**tournament)
-    if tournament_obj.status != TournamentStatus.AUCTION_ACTIVE:
+def check_bid_against_tournament(tournament: dict, amount: int):
+    """Raise the error a rejected bid deserves, given the tournament's current state"""
+    if tournament["status"] != TournamentStatus.AUCTION_ACTIVE:
         raise HTTPException(status_code=400, detail="Auction not active")
     
-    if datetime.utcnow() > tournament_obj.bid_end_time:
+    bid_end_time = tournament.get("bid_end_time")
+    if not bid_end_time or datetime.utcnow() > bid_end_time:
         raise HTTPException(status_code=400, detail="Bidding time expired")
     
-    if amount < tournament_obj.minimum_bid:
+    if amount < tournament["minimum_bid"]:
         raise HTTPException(status_code=400, detail="Bid too low")
     
+    current_high_bid = tournament.get("current_high_bid")
+    if current_high_bid is not None and amount <= current_high_bid:
+        raise HTTPException(status_code=400, detail="Bid must be higher than current highest")
+
+async def accept_bid_in_db(tournament_id: str, user_id: str, amount: int):
+    """Validate and store a bid directly against Mongo (used when the engine is off)"""
+    tournament, squad, user = await asyncio.gather(
+        db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_BID),
+        db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id}, projections.SQUAD_BUDGET),
+        db.users.find_one({"id": user_id}, projections.USERNAME)
+    )
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    
+    check_bid_against_tournament(tournament, amount)
+    current_team_id = tournament["current_team_id"]
+    
     # Check user's budget
-    squad = await db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id})
     if not squad:
         raise HTTPException(status_code=404, detail="Squad not found")
     
-    squad_obj = Squad(**squad)
-    remaining_budget = tournament_obj.budget_per_user - squad_obj.total_spent
-    remaining_teams = tournament_obj.teams_per_user - len(squad_obj.teams)
+    remaining_budget = tournament["budget_per_user"] - squad.get("total_spent", 0)
+    remaining_teams = tournament["teams_per_user"] - len(squad.get("teams", []))
     
     if remaining_teams > 1:
-        max_bid = remaining_budget - ((remaining_teams - 1) * tournament_obj.minimum_bid)
+        max_bid = remaining_budget - ((remaining_teams - 1) * tournament["minimum_bid"])
     else:
         max_bid = remaining_budget
     
     if amount > max_bid:
         raise HTTPException(status_code=400, detail="Insufficient budget")
     
-    # Get current highest bid
-    current_highest_bid = await db.bids.find_one(
-        {"tournament_id": tournament_id, "team_id": tournament_obj.current_team_id},
-        sort=[("amount", -1)]
+    # Accept the bid in one atomic step: same lot, still open, and higher than
+    # the stored high bid. Concurrent bids can no longer both pass the check.
+    accepted = await db.tournaments.find_one_and_update(
+        {
+            "id": tournament_id,
+            "status": TournamentStatus.AUCTION_ACTIVE,
+            "current_team_id": current_team_id,
+            "bid_end_time": {"$gte": datetime.utcnow()},
+            "$or": [
+                {"current_high_bid": None},
+                {"current_high_bid": {"$lt": amount}}
+            ]
+        },
+        {"$set": {"current_high_bid": amount, "current_high_bidder_id": user_id}},
+        projection={"_id": 0, "id": 1}
     )
-    
-    if current_highest_bid and amount <= current_highest_bid["amount"]:
+    if not accepted:
+        # Lost a race - report whatever changed underneath us
+        latest = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_BID)
+        if latest:
+            check_bid_against_tournament(latest, amount)
+            if latest["current_team_id"] != current_team_id:
+                raise HTTPException(status_code=400, detail="Team has changed, bid not placed")
         raise HTTPException(status_code=400, detail="Bid must be higher than current highest")
     
-    # Place bid
+    # Append to the bid log
     bid = Bid(
         tournament_id=tournament_id,
         user_id=user_id,
-        team_id=tournament_obj.current_team_id,
+        team_id=current_team_id,
         amount=amount
     )
     await db.bids.insert_one(bid.dict())
+    await bump_version(tournament_id)
+    
+    return bid, user["username"] if user else "Unknown", tournament.get("bid_coalesce_ms", 0)
+
+@api_router.post("/tournaments/{tournament_id}/bid")
+async def place_bid(tournament_id: str, user_id: str, amount: int, idempotency_key: Optional[str] = Header(None)):
+    return await idempotency.run(
+        f"bid:{tournament_id}:{user_id}", idempotency_key,
+        lambda: _place_bid(tournament_id, user_id, amount)
+    )
+
+async def _place_bid(tournament_id: str, user_id: str, amount: int):
+    if USE_AUCTION_ENGINE:
+        # Validated in memory; the bid itself is persisted by the write-behind writer
+        auction = await auction_engine.accept_bid(tournament_id, user_id, amount)
+        bid = Bid(
+            tournament_id=tournament_id,
+            user_id=user_id,
+            team_id=auction.current_team_id,
+            amount=amount
+        )
+        await bid_writer.submit(bid.dict())
+        username = auction.usernames.get(user_id, "Unknown")
+        bid_coalesce_ms = auction.bid_coalesce_ms
+    else:
+        bid, username, bid_coalesce_ms = await accept_bid_in_db(tournament_id, user_id, amount)
     
     # Broadcast new bid
-    user = await db.users.find_one({"id": user_id})
     await manager.broadcast_to_tournament(tournament_id, {
         "type": "new_bid",
-        "team_id": tournament_obj.current_team_id,
+        "bid_id": bid.id,
+        "team_id": bid.team_id,
+        "user_id": user_id,
         "amount": amount,
-        "username": user["username"] if user else "Unknown"
-    })
+        "username": username,
+        "timestamp": bid.timestamp.isoformat()
+    }, coalesce_window=bid_coalesce_ms / 1000)
     
     return {"message": "Bid placed successfully"}
 
 # Admin override route (for testing only)
 @api_router.patch("/tournaments/{tournament_id}/admin")
 async def update_tournament_admin(tournament_id: str, request_data: dict):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
+    tournament = await db.tournaments.find_one({"id": tournament_id}, projections.EXISTS)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
@@ -537,15 +831,20 @@ async def update_tournament_admin(tournament_id: str, request_data: dict):
     # Update tournament admin
     await db.tournaments.update_one(
         {"id": tournament_id},
-        {"$set": {"admin_id": new_admin_id}}
+        {"$set": {"admin_id": new_admin_id}, "$inc": {"version": 1}}
     )
     
+    await manager.broadcast_to_tournament(tournament_id, {
+        "type": "admin_changed",
+        "admin_id": new_admin_id
+    })
+    
     return {"message": "Tournament admin updated successfully"}
 
 # Reset auction timer (for testing)
 @api_router.post("/tournaments/{tournament_id}/reset-timer")
 async def reset_auction_timer(tournament_id: str):
-    tournament = await db.tournaments.find_one({"id": tournament_id})
+    tournament = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_LOT)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
@@ -553,15 +852,70 @@ async def reset_auction_timer(tournament_id: str):
     new_end_time = datetime.utcnow() + timedelta(minutes=2)
     await db.tournaments.update_one(
         {"id": tournament_id},
-        {"$set": {"bid_end_time": new_end_time}}
+        {"$set": {"bid_end_time": new_end_time}, "$inc": {"version": 1}}
     )
     
+    auction_engine.invalidate(tournament_id)
+    if tournament.get("status") == "auction_active":
+        lot_scheduler.schedule(tournament_id, tournament.get("current_team_id"), new_end_time)
+    await manager.broadcast_to_tournament(tournament_id, {
+        "type": "timer_reset",
+        "bid_end_time": new_end_time.isoformat()
+    })
+    
     return {"message": "Auction timer reset", "new_bid_end_time": new_end_time.isoformat()}
 
-@api_router.post("/tournaments/{tournament_id}/advance-team")
-async def advance_to_next_team(tournament_id: str):
-    """Advance auction to next team - handles timer expiry and unbid teams"""
-    tournament_obj = await db.tournaments.find_one({"id": tournament_id})
+async def settle_lot(tournament_id: str, team_id: str, user_id: str, amount: int):
+    """
+    Award a closed lot to the high bidder and broadcast the winner's squad.
+
+    The tournament update that closes the lot records it as `pending_settlement`;
+    that marker is cleared here once the squad has been updated, and startup
+    re-applies any marker left behind by a crash. The squad update is guarded
+    by `teams $ne`, so applying it twice cannot award the team twice.
+    """
+    squad = await db.squads.find_one_and_update(
+        {"tournament_id": tournament_id, "user_id": user_id, "teams": {"$ne": team_id}},
+        {"$push": {"teams": team_id}, "$inc": {"total_spent": amount}},
+        projection=model_projection(Squad),
+        return_document=ReturnDocument.AFTER
+    )
+    if squad is None:
+        squad = await db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id}, model_projection(Squad))
+        if squad is None:
+            logger.error(f"Cannot settle team {team_id} in tournament {tournament_id}: no squad for {user_id}")
+    
+    await db.tournaments.update_one(
+        {"id": tournament_id, "pending_settlement.team_id": team_id},
+        {"$set": {"pending_settlement": None}, "$inc": {"version": 1}}
+    )
+    if squad is None:
+        return
+    
+    user = await db.users.find_one({"id": user_id}, projections.USERNAME)
+    await manager.broadcast_to_tournament(tournament_id, {
+        "type": "lot_settled",
+        "team_id": team_id,
+        "user_id": user_id,
+        "username": user["username"] if user else "Unknown",
+        "amount": amount,
+        "squad": squad
+    })
+
+async def advance_lot(tournament_id: str, expected_team_id: Optional[str] = None) -> Optional[dict]:
+    """
+    Close the current lot and move to the next team, or complete the auction.
+    Returns None if the lot was already advanced (or is not `expected_team_id`).
+    """
+    # From before the flush until the lot has moved (or this caller lost), the
+    # engine rejects bids, so none is acknowledged and then missed by the close
+    with auction_engine.closing(tournament_id):
+        return await _advance_lot(tournament_id, expected_team_id)
+
+async def _advance_lot(tournament_id: str, expected_team_id: Optional[str]) -> Optional[dict]:
+    # Bids accepted by the engine must be recorded before we read the high bid
+    await bid_writer.flush(tournament_id)
+    tournament_obj = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_ADVANCE)
     if not tournament_obj:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
@@ -569,80 +923,206 @@ async def advance_to_next_team(tournament_id: str):
         raise HTTPException(status_code=400, detail="Auction not active")
     
     current_team_id = tournament_obj.get("current_team_id")
-    teams_list = tournament_obj.get("teams", [])
+    if "auction_order" not in tournament_obj:
+        tournament_obj = await adopt_auction_order(tournament_obj)
+    auction_order = tournament_obj.get("auction_order", [])
+    auction_cursor = tournament_obj.get("auction_cursor", 0)
+    reauction_queue = tournament_obj.get("reauction_queue", [])
     
-    if not current_team_id or not teams_list:
+    if not current_team_id or not auction_order:
         raise HTTPException(status_code=400, detail="No teams to auction")
     
-    # Check if current team received any bids
-    current_bids = await db.bids.find({"tournament_id": tournament_id, "team_id": current_team_id}).to_list(1000)
+    if expected_team_id is not None and current_team_id != expected_team_id:
+        return None
+    
+    # Only the caller that still sees this lot (and its high bid) as current gets to close it
+    current_lot_filter = {
+        "id": tournament_id,
+        "status": "auction_active",
+        "current_team_id": current_team_id,
+        "current_high_bid": tournament_obj.get("current_high_bid")
+    }
+    
+    # The stored high bid says whether the lot sold - no need to read the bid log
+    had_bids = tournament_obj.get("current_high_bid") is not None
+    settled_team_ids = set(tournament_obj.get("settled_team_ids", []))
+    
+    # A sold lot is marked settled and recorded for settle_lot in the same update that closes it
+    settlement = None
+    lot_close, settlement_fields = {}, {}
+    if had_bids:
+        settled_team_ids.add(current_team_id)
+        settlement = {
+            "team_id": current_team_id,
+            "user_id": tournament_obj["current_high_bidder_id"],
+            "amount": tournament_obj["current_high_bid"]
+        }
+        lot_close = {"$addToSet": {"settled_team_ids": current_team_id}}
+        settlement_fields = {"pending_settlement": settlement}
     
-    # If no bids, move team to end of queue for re-auction later
-    if not current_bids:
-        # Remove current team from current position and add to end
-        if current_team_id in teams_list:
-            teams_list.remove(current_team_id)
-            teams_list.append(current_team_id)
-            print(f"Team {current_team_id} had no bids - moved to end of queue")
+    # Pick the next lot: the rest of the shuffled order first, then unbid lots
+    # in the order they closed
+    next_team_id, queue_update = next_lot(auction_order, auction_cursor, reauction_queue, current_team_id, had_bids)
+    queue_update.setdefault("$inc", {})["version"] = 1
+    if next_team_id is None and not auction_complete(settled_team_ids, auction_order):
+        logger.warning(f"Tournament {tournament_id} has no lots left but unsold teams; completing it")
     
-    # Find next team
     try:
-        current_index = teams_list.index(current_team_id) if current_team_id in teams_list else -1
-        next_index = (current_index + 1) % len(teams_list)
-        next_team_id = teams_list[next_index]
-        
-        # If we've cycled back to a team that was already auctioned with bids, auction is complete
-        if next_index == 0 and current_bids:
-            # Check if all teams have been bid on at least once
-            all_teams_bid = True
-            for team_id in teams_list:
-                team_bids = await db.bids.find({"tournament_id": tournament_id, "team_id": team_id}).to_list(1)
-                if not team_bids:
-                    all_teams_bid = False
-                    break
-            
-            if all_teams_bid:
-                # End auction
-                await db.tournaments.update_one(
-                    {"id": tournament_id},
-                    {"$set": {
-                        "status": "completed",
-                        "current_team_id": None,
-                        "bid_end_time": None
-                    }}
-                )
-                return {"message": "Auction completed", "status": "completed"}
+        # Once every team has been bid on at least once (or nothing is left to
+        # open), the auction is complete
+        if next_team_id is None or (had_bids and auction_complete(settled_team_ids, auction_order)):
+            result = await db.tournaments.update_one(
+                current_lot_filter,
+                {"$set": {
+                    "status": "completed",
+                    "current_team_id": None,
+                    "bid_end_time": None,
+                    "current_high_bid": None,
+                    "current_high_bidder_id": None,
+                    **settlement_fields
+                }, "$inc": {"version": 1}, **lot_close}
+            )
+            if not result.modified_count:
+                return None
+            # Before any await, so the engine cannot accept bids on the closed lot
+            auction_engine.invalidate(tournament_id)
+            lot_scheduler.cancel(tournament_id)
+            await settle_lot(tournament_id, **settlement)
+            await manager.broadcast_to_tournament(tournament_id, {
+                "type": "auction_ended",
+                "status": "completed",
+                "previous_team_id": current_team_id
+            })
+            return {"message": "Auction completed", "status": "completed"}
         
         # Move to next team
         new_end_time = datetime.utcnow() + timedelta(minutes=2)
-        await db.tournaments.update_one(
-            {"id": tournament_id},
+        result = await db.tournaments.update_one(
+            current_lot_filter,
             {"$set": {
                 "current_team_id": next_team_id,
                 "bid_end_time": new_end_time,
-                "teams": teams_list  # Update teams list in case we moved unbid team to end
-            }}
+                "current_high_bid": None,
+                "current_high_bidder_id": None,
+                **settlement_fields
+            }, **lot_close, **queue_update}
         )
+        if not result.modified_count:
+            return None
+        # Before any await, so the engine cannot accept bids on the closed lot and
+        # the new lot has its timer even if settling or broadcasting fails
+        auction_engine.invalidate(tournament_id)
+        lot_scheduler.schedule(tournament_id, next_team_id, new_end_time)
+        if not had_bids:
+            logger.info(f"Team {current_team_id} had no bids in tournament {tournament_id} - queued for re-auction")
+        if had_bids:
+            await settle_lot(tournament_id, **settlement)
+        
+        await manager.broadcast_to_tournament(tournament_id, {
+            "type": "lot_changed",
+            "previous_team_id": current_team_id,
+            "had_bids": had_bids,
+            "current_team_id": next_team_id,
+            "bid_end_time": new_end_time.isoformat()
+        })
         
         return {
             "message": "Advanced to next team",
             "current_team_id": next_team_id,
             "new_bid_end_time": new_end_time.isoformat(),
-            "had_bids": len(current_bids) > 0
+            "had_bids": had_bids
         }
         
     except (ValueError, IndexError):
         raise HTTPException(status_code=400, detail="Error advancing to next team")
 
+async def adopt_auction_order(tournament: dict) -> dict:
+    """
+    Give an auction started before auction_order existed a queue based on its
+    teams list. Teams with bids before the current lot count as sold; the
+    unsold ones behind the cursor wait in the re-auction queue.
+    """
+    # Only these legacy auctions need the full teams list, so it is read here
+    stored = await db.tournaments.find_one({"id": tournament["id"]}, projections.fields("teams"))
+    teams_list = stored.get("teams", []) if stored else []
+    current_team_id = tournament.get("current_team_id")
+    if current_team_id not in teams_list:
+        return tournament
+    # A lot with bids was sold when it closed; the current lot is still open
+    sold = set(await db.bids.distinct("team_id", {"tournament_id": tournament["id"]}))
+    sold.discard(current_team_id)
+    cursor = teams_list.index(current_team_id) + 1
+    await db.tournaments.update_one(
+        {"id": tournament["id"], "auction_order": {"$exists": False}},
+        {"$set": {
+            "auction_order": teams_list,
+            "auction_cursor": cursor,
+            "reauction_queue": [team_id for team_id in teams_list[:cursor - 1] if team_id not in sold],
+            "settled_team_ids": [team_id for team_id in teams_list if team_id in sold]
+        }, "$inc": {"version": 1}}
+    )
+    return await db.tournaments.find_one({"id": tournament["id"]}, projections.TOURNAMENT_ADVANCE)
+
+async def resume_pending_settlements():
+    """Apply lots that were closed but not yet awarded when the server last stopped"""
+    cursor = db.tournaments.find(
+        {"pending_settlement": {"$ne": None}},
+        projections.fields("id", "pending_settlement")
+    )
+    async for tournament in cursor:
+        logger.info(f"Resuming settlement of {tournament['pending_settlement']} in tournament {tournament['id']}")
+        await settle_lot(tournament["id"], **tournament["pending_settlement"])
+
+EXPIRE_ATTEMPTS = 5
+
+async def expire_lot(tournament_id: str, team_id: str):
+    """Lot timer callback: advance once the lot's deadline has really passed"""
+    for _ in range(EXPIRE_ATTEMPTS):
+        tournament = await db.tournaments.find_one(
+            {"id": tournament_id},
+            projections.TOURNAMENT_LOT
+        )
+        if not tournament or tournament.get("status") != "auction_active" or tournament.get("current_team_id") != team_id:
+            return
+        
+        # The timer may have been reset by another process since it was scheduled
+        bid_end_time = tournament.get("bid_end_time")
+        if bid_end_time and bid_end_time > datetime.utcnow():
+            lot_scheduler.schedule(tournament_id, team_id, bid_end_time)
+            return
+        
+        if await advance_lot(tournament_id, expected_team_id=team_id) is not None:
+            return
+        # The lot is still current but its high bid moved after we read it
+        # (e.g. a queued bid landed) - read it again and retry the close
+    
+    raise RuntimeError(f"Lot kept changing under {EXPIRE_ATTEMPTS} attempts to close it")
+
+lot_scheduler = LotScheduler(expire_lot)
+
+@api_router.post("/tournaments/{tournament_id}/advance-team")
+async def advance_to_next_team(tournament_id: str, expected_team_id: Optional[str] = None):
+    """
+    Advance auction to next team - lots also advance on their own when the timer expires.
+    Pass the `current_team_id` you saw as `expected_team_id`; if another caller has
+    already moved past that lot the request fails with 409 instead of skipping a lot.
+    """
+    result = await advance_lot(tournament_id, expected_team_id)
+    if result is None:
+        raise HTTPException(status_code=409, detail="Lot already advanced")
+    return result
+
 @api_router.post("/tournaments/{tournament_id}/fix-team-ids")
 async def fix_tournament_team_ids(tournament_id: str):
     """Fix tournament team IDs to use actual teams from database"""
-    tournament_obj = await db.tournaments.find_one({"id": tournament_id})
+    tournament_obj = await db.tournaments.find_one({"id": tournament_id}, projections.TOURNAMENT_FIX_TEAMS)
     if not tournament_obj:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
     # Get actual teams from database
-    teams = await db.teams.find({"competition": tournament_obj.get("competition_type", "champions_league")}).to_list(1000)
+    teams = await db.teams.find(
+        {"competition": tournament_obj.get("competition_type", "champions_league")}, projections.TEAM_IDS
+    ).to_list(1000)
     valid_team_ids = [team["id"] for team in teams]
     
     if not valid_team_ids:
@@ -655,16 +1135,32 @@ async def fix_tournament_team_ids(tournament_id: str):
     # Reset tournament state with valid team IDs
     update_data = {
         "teams": valid_team_ids,
+        "auction_order": valid_team_ids,
+        "auction_cursor": 1,
+        "reauction_queue": [],
         "current_team_id": valid_team_ids[0] if valid_team_ids else None,
         "status": "auction_active",
-        "bid_end_time": datetime.utcnow() + timedelta(minutes=2)
+        "bid_end_time": datetime.utcnow() + timedelta(minutes=2),
+        "current_high_bid": None,
+        "current_high_bidder_id": None,
+        "settled_team_ids": []
     }
     
     await db.tournaments.update_one(
         {"id": tournament_id},
-        {"$set": update_data}
+        {"$set": update_data, "$inc": {"version": 1}}
     )
     
+    auction_engine.invalidate(tournament_id)
+    lot_scheduler.schedule(tournament_id, update_data["current_team_id"], update_data["bid_end_time"])
+    await manager.broadcast_to_tournament(tournament_id, {
+        "type": "lot_changed",
+        "previous_team_id": tournament_obj.get("current_team_id"),
+        "had_bids": False,
+        "current_team_id": update_data["current_team_id"],
+        "bid_end_time": update_data["bid_end_time"].isoformat()
+    })
+    
     return {
         "message": "Tournament team IDs fixed",
         "teams_count": len(valid_team_ids),
@@ -674,21 +1170,31 @@ async def fix_tournament_team_ids(tournament_id: str):
 
 # Squad routes
 @api_router.get("/tournaments/{tournament_id}/squads", response_model=List[Squad])
-async def get_tournament_squads(tournament_id: str):
-    squads = await db.squads.find({"tournament_id": tournament_id}).to_list(1000)
-    return [Squad(**squad) for squad in squads]
+async def get_tournament_squads(tournament_id: str, request: Request):
+    headers = await sub_resource_headers(tournament_id, "squads")
+    if headers and etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    squads = await db.squads.find({"tournament_id": tournament_id}, model_projection(Squad)).to_list(1000)
+    return documents_response(Squad, squads, headers)
 
 @api_router.get("/tournaments/{tournament_id}/squads/{user_id}", response_model=Squad)
 async def get_user_squad(tournament_id: str, user_id: str):
-    squad = await db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id})
+    squad = await db.squads.find_one({"tournament_id": tournament_id, "user_id": user_id}, model_projection(Squad))
     if not squad:
         raise HTTPException(status_code=404, detail="Squad not found")
-    return Squad(**squad)
+    return document_response(Squad, squad)
 
 # Chat routes
 @api_router.post("/tournaments/{tournament_id}/chat")
-async def send_chat_message(tournament_id: str, user_id: str, message_data: ChatMessageCreate):
-    user = await db.users.find_one({"id": user_id})
+async def send_chat_message(tournament_id: str, user_id: str, message_data: ChatMessageCreate,
+                            idempotency_key: Optional[str] = Header(None)):
+    return await idempotency.run(
+        f"chat:{tournament_id}:{user_id}", idempotency_key,
+        lambda: _send_chat_message(tournament_id, user_id, message_data)
+    )
+
+async def _send_chat_message(tournament_id: str, user_id: str, message_data: ChatMessageCreate):
+    user = await db.users.find_one({"id": user_id}, projections.USERNAME)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -699,10 +1205,13 @@ async def send_chat_message(tournament_id: str, user_id: str, message_data: Chat
         message=message_data.message
     )
     await db.chat_messages.insert_one(message.dict())
+    await bump_version(tournament_id)
     
     # Broadcast message
     await manager.broadcast_to_tournament(tournament_id, {
         "type": "chat_message",
+        "id": message.id,
+        "user_id": user_id,
         "username": user["username"],
         "message": message_data.message,
         "timestamp": message.timestamp.isoformat()
@@ -711,21 +1220,169 @@ async def send_chat_message(tournament_id: str, user_id: str, message_data: Chat
     return {"message": "Message sent"}
 
 @api_router.get("/tournaments/{tournament_id}/chat", response_model=List[ChatMessage])
-async def get_chat_messages(tournament_id: str):
-    messages = await db.chat_messages.find(
-        {"tournament_id": tournament_id}
-    ).sort("timestamp", 1).to_list(1000)
-    return [ChatMessage(**message) for message in messages]
+async def get_chat_messages(tournament_id: str, request: Request, since: Optional[datetime] = None,
+                            limit: Optional[int] = Query(None, ge=1)):
+    stream = wants_ndjson(request)
+    headers = await history_headers(tournament_id, "chat", stream)
+    if headers and etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    cursor = db.chat_messages.find(
+        history_filter(tournament_id, since), model_projection(ChatMessage)
+    ).sort("timestamp", 1)
+    return await history_response(ChatMessage, cursor, stream, limit, headers)
+
+@api_router.get("/realtime/stats")
+async def get_realtime_stats():
+    """WebSocket counters for this worker: opened, closed, evicted and live totals"""
+    return manager.get_stats()
+
+# Auction snapshots - the first frame on every fresh WebSocket. The view is
+# cached per tournament and reused while its sequence number is unchanged, so
+# a room of friends joining at once shares a single build.
+SNAPSHOT_CACHE_SIZE = 512
+SNAPSHOT_CHAT_LIMIT = 50
+SNAPSHOT_BID_HISTORY_LIMIT = 5
+snapshot_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+async def build_auction_snapshot(tournament_id: str, seq: int) -> Optional[dict]:
+    """Read everything the auction room needs in one consistent view"""
+    await bid_writer.flush(tournament_id)
+    tournament = await db.tournaments.find_one({"id": tournament_id}, model_projection(Tournament))
+    if not tournament:
+        return None
+    tournament_obj = Tournament(**tournament)
+    
+    squads, users, chat, lot_bids = await asyncio.gather(
+        db.squads.find({"tournament_id": tournament_id}, model_projection(Squad)).to_list(1000),
+        db.users.find({"id": {"$in": tournament_obj.participants}}, projections.USER_NAMES).to_list(1000),
+        db.chat_messages.find(
+            {"tournament_id": tournament_id}, model_projection(ChatMessage)
+        ).sort("timestamp", -1).to_list(SNAPSHOT_CHAT_LIMIT),
+        db.bids.find(
+            {"tournament_id": tournament_id, "team_id": tournament_obj.current_team_id}, model_projection(Bid)
+        ).sort("amount", -1).to_list(SNAPSHOT_BID_HISTORY_LIMIT)
+    )
+    usernames = {user["id"]: user["username"] for user in users}
+    recent_bids = [
+        {**Bid(**bid).dict(), "username": usernames.get(bid["user_id"], "Unknown")}
+        for bid in lot_bids
+    ]
+    
+    return {
+        "type": "snapshot",
+        "seq": seq,
+        "tournament": tournament_obj.dict(),
+        "high_bid": recent_bids[0] if recent_bids else None,
+        "recent_bids": recent_bids,
+        "squads": [Squad(**squad).dict() for squad in squads],
+        "participants": [
+            {"id": user_id, "username": usernames.get(user_id, "Unknown")}
+            for user_id in tournament_obj.participants
+        ],
+        "chat": [ChatMessage(**message).dict() for message in reversed(chat)]
+    }
+
+async def get_auction_snapshot(tournament_id: str) -> Optional[dict]:
+    """Return the cached snapshot for the current sequence, building it at most once"""
+    seq = await manager.current_sequence(tournament_id)
+    cached = snapshot_cache.get(tournament_id)
+    if cached is None or cached[0] != seq:
+        cached = (seq, asyncio.ensure_future(build_auction_snapshot(tournament_id, seq)))
+        snapshot_cache[tournament_id] = cached
+        while len(snapshot_cache) > SNAPSHOT_CACHE_SIZE:
+            snapshot_cache.popitem(last=False)
+    else:
+        snapshot_cache.move_to_end(tournament_id)
+    
+    try:
+        view = await asyncio.shield(cached[1])
+    except Exception:
+        if snapshot_cache.get(tournament_id) is cached:
+            del snapshot_cache[tournament_id]
+        raise
+    if view is None:
+        snapshot_cache.pop(tournament_id, None)
+        return None
+    
+    # Timing fields are per-send; the cached view itself is shared
+    now = datetime.utcnow()
+    bid_end_time = view["tournament"]["bid_end_time"]
+    return {
+        **view,
+        "server_time": now.isoformat(),
+        "time_remaining": max(0, int((bid_end_time - now).total_seconds())) if bid_end_time else 0
+    }
+
+# Commands clients can send over the auction WebSocket. Each one runs through
+# the same route handler (and validation) as its REST equivalent and gets an
+# "ack" or "error" frame back carrying the command's "id".
+async def handle_socket_command(connection, tournament_id: str, command: dict, default_user_id: Optional[str]):
+    command_type = command.get("type")
+    user_id = command.get("user_id") or default_user_id
+    try:
+        if command_type == "advance":
+            result = await advance_to_next_team(tournament_id, command.get("expected_team_id"))
+        elif command_type in ("bid", "chat"):
+            if not user_id:
+                raise HTTPException(status_code=400, detail="user_id required")
+            if command_type == "bid":
+                amount = command.get("amount")
+                if not isinstance(amount, int) or isinstance(amount, bool):
+                    raise HTTPException(status_code=422, detail="amount must be an integer")
+                result = await place_bid(tournament_id, user_id, amount, command.get("idempotency_key"))
+            else:
+                message_data = ChatMessageCreate(message=command.get("message"))
+                result = await send_chat_message(tournament_id, user_id, message_data, command.get("idempotency_key"))
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown command type: {command_type}")
+    except HTTPException as e:
+        manager.send_to(connection, {
+            "type": "error",
+            "id": command.get("id"),
+            "status": e.status_code,
+            "detail": e.detail
+        })
+    except ValidationError as e:
+        manager.send_to(connection, {
+            "type": "error",
+            "id": command.get("id"),
+            "status": 422,
+            "detail": e.errors(include_url=False, include_context=False)
+        })
+    else:
+        manager.send_to(connection, {"type": "ack", "id": command.get("id"), "result": result})
 
 # WebSocket endpoint
 @app.websocket("/ws/{tournament_id}")
-async def websocket_endpoint(websocket: WebSocket, tournament_id: str):
-    await manager.connect(websocket, tournament_id)
+async def websocket_endpoint(websocket: WebSocket, tournament_id: str, since: Optional[int] = None,
+                             user_id: Optional[str] = None):
+    # Buffer the room's events before reading its sequence, so anything
+    # published while the snapshot is built is replayed after it
+    manager.watch_room(tournament_id)
+    # Reconnecting clients pass the last sequence number they applied as ?since=
+    # and only get what they missed; everyone else starts from a full snapshot
+    snapshot = None
+    if since is None or not manager.can_resume(tournament_id, since):
+        snapshot = await get_auction_snapshot(tournament_id)
+        if snapshot is None:
+            await websocket.close(code=1008)
+            return
+        since = snapshot["seq"]
+    connection = await manager.connect(websocket, tournament_id, since=since, first_frame=snapshot)
     try:
         while True:
-            await websocket.receive_text()
+            # Every frame, including the client's "pong" replies to our pings,
+            # keeps the connection alive in the heartbeat sweep
+            command = await connection.receive()
+            if command is None:
+                manager.send_to(connection, {"type": "error", "id": None, "status": 400, "detail": "Invalid frame"})
+            elif command.get("type") != "pong":
+                await handle_socket_command(connection, tournament_id, command, user_id)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, tournament_id)
+        pass
+    finally:
+        # Whatever ended the loop, the socket must not stay registered
+        manager.disconnect(connection)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -736,6 +1393,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, NEXT_SINCE_HEADER],
 )
 
 # Configure logging
@@ -747,9 +1405,19 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes(db)
     await initialize_teams()
     logger.info("Teams initialized")
+    await manager.start()
+    await bid_writer.start()
+    await resume_pending_settlements()
+    # Rebuild timers for auctions that were running before a restart
+    await lot_scheduler.start(db)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await lot_scheduler.stop()
+    await manager.stop()
+    # Persist any bids still queued by the auction engine
+    await bid_writer.stop()
     client.close()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Team catalog sync.
+
+The catalog (Champions League, Europa League and Ryder Cup entries) is
+written with one bulk_write of upserts keyed on (competition, name), so a
+restart touches only rows whose data changed and never re-issues team IDs
+that running tournaments refer to. New rows get a deterministic uuid5 ID
+derived from competition and name; rows that predate this keep their ID.
+Entries no longer in the catalog are removed in the same bulk_write.
+
+`TeamCatalog` keeps the synced catalog in memory for GET /teams: teams are
+indexed by ID and competition, and each response body is serialized once
+together with a strong ETag, so repeat requests are answered without Mongo.
+The catalog only changes through a sync. A sync that changed any row bumps a
+stored catalog version; the worker that ran it reloads straight away, and the
+others compare the stored version with the one they loaded (see
+`catalog_version`) and reload when it moved.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+TEAM_ID_NAMESPACE = uuid.UUID("5b0e7f0c-8d1c-4c36-9a53-2f3c1e6a9d41")
+CATALOG_VERSION_ID = "teams"
+
+
+def catalog_team_id(competition: str, name: str) -> str:
+    """Stable team ID for a catalog entry"""
+    return str(uuid.uuid5(TEAM_ID_NAMESPACE, f"{competition}:{name}"))
+
+
+async def catalog_version(versions) -> int:
+    """Stored catalog version; 0 before the first change"""
+    doc = await versions.find_one({"_id": CATALOG_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+async def sync_catalog(collection, versions, teams: List[dict]):
+    """
+    Upsert `teams` and drop stale entries of the same competitions in one round
+    trip, then bump the version in `versions` if anything changed
+    """
+    operations = []
+    names_by_competition = defaultdict(list)
+    for team in teams:
+        fields = {key: value for key, value in team.items() if key != "id"}
+        names_by_competition[team["competition"]].append(team["name"])
+        operations.append(UpdateOne(
+            {"competition": team["competition"], "name": team["name"]},
+            {"$set": fields, "$setOnInsert": {"id": team["id"]}},
+            upsert=True
+        ))
+    for competition, names in names_by_competition.items():
+        operations.append(DeleteMany({"competition": competition, "name": {"$nin": names}}))
+
+    result = await collection.bulk_write(operations, ordered=False)
+    logger.info(
+        f"Team catalog synced: {result.upserted_count} added, {result.modified_count} updated, "
+        f"{result.deleted_count} removed, {len(teams)} total"
+    )
+    if result.upserted_count or result.modified_count or result.deleted_count:
+        await versions.update_one({"_id": CATALOG_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+    return result
+
+
+class TeamCatalog:
+    """Immutable snapshot of the team catalog with pre-serialized responses"""
+
+    def __init__(self, teams: List[dict] = (), version: int = 0):
+        self.version = version
+        by_competition = defaultdict(list)
+        for team in teams:
+            by_competition[team["competition"]].append(team)
+        self.by_id = MappingProxyType({team["id"]: team for team in teams})
+        self.by_competition = MappingProxyType({
+            competition: tuple(members) for competition, members in by_competition.items()
+        })
+        # competition (None = every team) -> (body, etag)
+        self._responses: Dict[Optional[str], Tuple[bytes, str]] = {None: self._serialize(teams)}
+        for competition, members in self.by_competition.items():
+            self._responses[competition] = self._serialize(members)
+
+    @staticmethod
+    def _serialize(teams) -> Tuple[bytes, str]:
+        body = json.dumps(list(teams), separators=(",", ":")).encode()
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def response(self, competition: Optional[str] = None) -> Tuple[bytes, str]:
+        """JSON body and ETag for the whole catalog or one competition"""
+        if competition not in self._responses:
+            return self._serialize([])
+        return self._responses[competition]
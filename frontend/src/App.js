@@ -26,7 +26,6 @@ const API = `${BACKEND_URL}/api`;
 // Main App component
 function App() {
   const [user, setUser] = useState(null);
-  const [tournaments, setTournaments] = useState([]);
   const [currentTournament, setCurrentTournament] = useState(null);
   const [showUserGuide, setShowUserGuide] = useState(false);
 
@@ -76,8 +75,6 @@ function App() {
   const value = {
     user,
     setUser,
-    tournaments,
-    setTournaments,
     currentTournament,
     setCurrentTournament,
     API
@@ -128,44 +125,102 @@ function App() {
   );
 }
 
+// Server-side filters behind the public lobby tabs ("my" and "created" come from the user's own list)
+const LOBBY_FILTERS = {
+  all: {},
+  active: { status: 'auction_active' },
+  pending: { status: 'pending' },
+  completed: { status: 'completed' }
+};
+
 // Enhanced Dashboard Component with Multi-Tournament Support
 const Dashboard = () => {
-  const { user, tournaments, setTournaments, API } = useAppContext();
+  const { user, API } = useAppContext();
   const navigate = useNavigate();
   const [joinCode, setJoinCode] = useState('');
   const [showJoinByCode, setShowJoinByCode] = useState(false);
-  const [tournamentFilter, setTournamentFilter] = useState('all'); // all, active, pending, completed, my
+  const [tournamentFilter, setTournamentFilter] = useState('all'); // all, my, active, pending, completed, created
   const [userStats, setUserStats] = useState(null);
+  // Public tabs are filtered and paginated (newest first) on the server, each with
+  // its own cursor: { [filter]: { items, nextCursor } }
+  const [lobbyLists, setLobbyLists] = useState({});
+  // Every tournament the user takes part in, for the personal tabs, stats and achievements
+  const [myTournaments, setMyTournaments] = useState([]);
 
   useEffect(() => {
-    fetchTournaments();
-    fetchUserStats();
+    fetchLobby('all');
+    fetchMyTournaments();
   }, []);
 
-  const fetchTournaments = async () => {
+  useEffect(() => {
+    if (LOBBY_FILTERS[tournamentFilter] && !lobbyLists[tournamentFilter]) {
+      fetchLobby(tournamentFilter);
+    }
+  }, [tournamentFilter]);
+
+  useEffect(() => {
+    setUserStats({
+      tournaments_joined: myTournaments.length,
+      tournaments_created: myTournaments.filter(t => t.admin_id === user.id).length,
+      active_auctions: myTournaments.filter(t => t.status === 'auction_active').length,
+      completed_tournaments: myTournaments.filter(t => t.status === 'completed').length,
+      total_budget_allocated: myTournaments.length * 500 // Assuming £500m per tournament
+    });
+  }, [myTournaments]);
+
+  // "Load more" passes the tab's cursor and appends the next page
+  const fetchLobby = async (filter, cursor = null) => {
     try {
-      const response = await axios.get(`${API}/tournaments`);
-      setTournaments(response.data);
+      const params = { ...LOBBY_FILTERS[filter], ...(cursor ? { cursor } : {}) };
+      const response = await axios.get(`${API}/tournaments`, { params });
+      const nextCursor = response.headers['x-next-cursor'] || null;
+      setLobbyLists(previous => ({
+        ...previous,
+        [filter]: {
+          items: cursor ? [...(previous[filter]?.items || []), ...response.data] : response.data,
+          nextCursor
+        }
+      }));
     } catch (error) {
       console.error('Failed to fetch tournaments:', error);
     }
   };
 
-  const fetchUserStats = async () => {
+  // A user's own tournaments are few, so every page is loaded
+  const fetchMyTournaments = async () => {
     try {
-      // Calculate user statistics across all tournaments
-      const userTournaments = tournaments.filter(t => t.participants.includes(user.id));
-      const stats = {
-        tournaments_joined: userTournaments.length,
-        tournaments_created: tournaments.filter(t => t.admin_id === user.id).length,
-        active_auctions: userTournaments.filter(t => t.status === 'auction_active').length,
-        completed_tournaments: userTournaments.filter(t => t.status === 'completed').length,
-        total_budget_allocated: userTournaments.length * 500 // Assuming £500m per tournament
-      };
-      setUserStats(stats);
+      let items = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/tournaments`, {
+          params: { user_id: user.id, limit: 200, ...(cursor ? { cursor } : {}) }
+        });
+        items = items.concat(response.data);
+        cursor = response.headers['x-next-cursor'] || null;
+      } while (cursor);
+      setMyTournaments(items);
     } catch (error) {
-      console.error('Failed to calculate user stats:', error);
+      console.error('Failed to fetch your tournaments:', error);
+    }
+  };
+
+  const refreshTournaments = () => {
+    setLobbyLists({});
+    fetchLobby('all');
+    if (tournamentFilter !== 'all' && LOBBY_FILTERS[tournamentFilter]) {
+      fetchLobby(tournamentFilter);
     }
+    fetchMyTournaments();
+  };
+
+  const allTournaments = lobbyLists.all?.items || [];
+  const nextCursor = LOBBY_FILTERS[tournamentFilter] ? lobbyLists[tournamentFilter]?.nextCursor : null;
+
+  // Loaded count of a server-side list, with "+" while more pages exist
+  const lobbyCount = (filter) => {
+    const list = lobbyLists[filter];
+    if (!list) return null;
+    return `${list.items.length}${list.nextCursor ? '+' : ''}`;
   };
 
   const joinByCode = async () => {
@@ -179,7 +234,7 @@ const Dashboard = () => {
       alert('Successfully joined tournament!');
       setJoinCode('');
       setShowJoinByCode(false);
-      fetchTournaments(); // Refresh tournament list
+      refreshTournaments();
       
       // Navigate to the tournament page
       if (response.data.tournament) {
@@ -192,29 +247,20 @@ const Dashboard = () => {
   };
 
   const getFilteredTournaments = () => {
-    let filtered = tournaments;
+    let filtered;
     
     switch (tournamentFilter) {
       case 'my':
-        filtered = tournaments.filter(t => t.participants.includes(user.id));
-        break;
-      case 'active':
-        filtered = tournaments.filter(t => t.status === 'auction_active');
-        break;
-      case 'pending':
-        filtered = tournaments.filter(t => t.status === 'pending');
-        break;
-      case 'completed':
-        filtered = tournaments.filter(t => t.status === 'completed');
+        filtered = myTournaments;
         break;
       case 'created':
-        filtered = tournaments.filter(t => t.admin_id === user.id);
+        filtered = myTournaments.filter(t => t.admin_id === user.id);
         break;
       default:
-        filtered = tournaments;
+        filtered = lobbyLists[tournamentFilter]?.items || [];
     }
     
-    return filtered.sort((a, b) => {
+    return [...filtered].sort((a, b) => {
       // Sort by status priority: auction_active > pending > tournament_active > completed
       const statusPriority = {
         'auction_active': 4,
@@ -335,7 +381,7 @@ const Dashboard = () => {
         {/* Enhanced User Statistics - Mobile Optimized */}
         <div className="flex flex-wrap justify-center gap-4 md:gap-6 mt-6">
           <div className="text-center min-w-0">
-            <div className="text-xl md:text-2xl font-bold text-blue-400">{tournaments.length}</div>
+            <div className="text-xl md:text-2xl font-bold text-blue-400">{lobbyCount('all') || 0}</div>
             <div className="text-xs md:text-sm text-gray-400">Total Tournaments</div>
           </div>
           <div className="text-center min-w-0">
@@ -360,7 +406,7 @@ const Dashboard = () => {
       </header>
 
       {/* Tournament Filters - Mobile Optimized */}
-      {tournaments.length > 0 && (
+      {(allTournaments.length > 0 || myTournaments.length > 0) && (
         <div className="mb-8">
           <div className="bg-gray-800 p-4 rounded-lg">
             <div className="flex flex-col lg:flex-row lg:items-center lg:justify-between gap-4">
@@ -368,11 +414,11 @@ const Dashboard = () => {
                 <span className="text-gray-400 text-sm">Filter:</span>
                 <div className="flex flex-wrap gap-2">
                   {[
-                    { key: 'all', label: '🌐 All', shortLabel: 'All', count: tournaments.length },
-                    { key: 'my', label: '👤 My Tournaments', shortLabel: 'My', count: tournaments.filter(t => t.participants.includes(user.id)).length },
-                    { key: 'active', label: '🎪 Live Auctions', shortLabel: 'Live', count: tournaments.filter(t => t.status === 'auction_active').length },
-                    { key: 'pending', label: '⏳ Waiting', shortLabel: 'Wait', count: tournaments.filter(t => t.status === 'pending').length },
-                    { key: 'created', label: '🏆 Created by Me', shortLabel: 'Created', count: tournaments.filter(t => t.admin_id === user.id).length }
+                    { key: 'all', label: '🌐 All', shortLabel: 'All', count: lobbyCount('all') },
+                    { key: 'my', label: '👤 My Tournaments', shortLabel: 'My', count: myTournaments.length },
+                    { key: 'active', label: '🎪 Live Auctions', shortLabel: 'Live', count: lobbyCount('active') },
+                    { key: 'pending', label: '⏳ Waiting', shortLabel: 'Wait', count: lobbyCount('pending') },
+                    { key: 'created', label: '🏆 Created by Me', shortLabel: 'Created', count: myTournaments.filter(t => t.admin_id === user.id).length }
                   ].map(filter => (
                     <button
                       key={filter.key}
@@ -383,8 +429,8 @@ const Dashboard = () => {
                           : 'bg-gray-700 text-gray-300 hover:bg-gray-600'
                       }`}
                     >
-                      <span className="md:hidden">{filter.shortLabel} ({filter.count})</span>
-                      <span className="hidden md:inline">{filter.label} ({filter.count})</span>
+                      <span className="md:hidden">{filter.shortLabel}{filter.count !== null && ` (${filter.count})`}</span>
+                      <span className="hidden md:inline">{filter.label}{filter.count !== null && ` (${filter.count})`}</span>
                     </button>
                   ))}
                 </div>
@@ -398,7 +444,7 @@ const Dashboard = () => {
       )}
 
       {/* Enhanced Game Instructions */}
-      {tournaments.length === 0 && (
+      {allTournaments.length === 0 && (
         <div className="bg-gray-800 p-6 rounded-lg mb-8">
           <h2 className="text-xl font-semibold mb-4 text-center">🚀 How to Get Started</h2>
           <div className="grid md:grid-cols-3 gap-4">
@@ -471,7 +517,7 @@ const Dashboard = () => {
                 <div>
                   <h2 className="text-xl font-semibold">Tournament Center</h2>
                   <p className="text-sm text-gray-400">
-                    {tournamentFilter === 'all' && `${tournaments.length} total tournaments`}
+                    {tournamentFilter === 'all' && `${lobbyCount('all') || 0} total tournaments`}
                     {tournamentFilter === 'my' && `${getFilteredTournaments().length} tournaments you've joined`}
                     {tournamentFilter === 'active' && `${getFilteredTournaments().length} live auctions`}
                     {tournamentFilter === 'pending' && `${getFilteredTournaments().length} tournaments waiting to start`}
@@ -523,6 +569,14 @@ const Dashboard = () => {
                   <TournamentCard key={tournament.id} tournament={tournament} />
                 ))
               )}
+              {nextCursor && (
+                <button
+                  onClick={() => fetchLobby(tournamentFilter, nextCursor)}
+                  className="w-full bg-gray-700 hover:bg-gray-600 px-4 py-2 rounded-lg font-medium transition-colors text-sm"
+                >
+                  Load more tournaments
+                </button>
+              )}
             </div>
           </div>
         </div>
@@ -530,12 +584,12 @@ const Dashboard = () => {
 
       {/* Achievements Section */}
       <div className="mt-8">
-        <UserAchievements user={user} tournaments={tournaments} />
+        <UserAchievements user={user} tournaments={myTournaments} />
       </div>
 
       {/* Analytics Section */}
       <div className="mt-8">
-        <TournamentAnalytics tournaments={tournaments} user={user} />
+        <TournamentAnalytics tournaments={allTournaments} userTournaments={myTournaments} user={user} />
       </div>
     </div>
   );
@@ -988,8 +1042,8 @@ const TournamentView = () => {
       console.log('Fetching fresh tournament data...');
       
       const [tournamentRes, teamsRes] = await Promise.all([
-        axios.get(`${API}/tournaments/${tournamentId}?_t=${Date.now()}`), // Add timestamp to prevent caching
-        axios.get(`${API}/teams?_t=${Date.now()}`)
+        axios.get(`${API}/tournaments/${tournamentId}`), // Revalidated by ETag from the tournament version
+        axios.get(`${API}/teams`) // Revalidated by ETag - unchanged catalog comes back as a 304
       ]);
       
       console.log('Tournament data updated:', {
@@ -1465,18 +1519,20 @@ const AuctionRoomWrapper = () => {
 };
 
 // Advanced Analytics Component
-const TournamentAnalytics = ({ tournaments, user }) => {
-  const userTournaments = tournaments.filter(t => t.participants.includes(user.id));
-  const allUsers = [...new Set(tournaments.flatMap(t => t.participants))];
+// `tournaments` is the most recent page of the lobby; `userTournaments` is every
+// tournament the current user is in, so their own numbers are always complete
+const TournamentAnalytics = ({ tournaments, userTournaments, user }) => {
+  const allUsers = [...new Set([...tournaments.flatMap(t => t.participants), user.id])];
   
   // Calculate global leaderboard data
   const leaderboardData = allUsers.map(userId => {
-    const userTournamentsCount = tournaments.filter(t => t.participants.includes(userId)).length;
-    const createdCount = tournaments.filter(t => t.admin_id === userId).length;
-    const activeCount = tournaments.filter(t => t.participants.includes(userId) && t.status === 'auction_active').length;
+    const isCurrentUser = userId === user.id;
+    const source = isCurrentUser ? userTournaments : tournaments;
+    const userTournamentsCount = source.filter(t => t.participants.includes(userId)).length;
+    const createdCount = source.filter(t => t.admin_id === userId).length;
+    const activeCount = source.filter(t => t.participants.includes(userId) && t.status === 'auction_active').length;
     
     // Create a username for display (in real app, this would come from user data)
-    const isCurrentUser = userId === user.id;
     const username = isCurrentUser ? user.username : `User ${userId.substring(0, 8)}`;
     
     return {
@@ -196,14 +196,30 @@ const AuctionRoom = ({ tournamentId, user }) => {
   
   const chatContainerRef = useRef(null);
   const timerRef = useRef(null);
+  // Delta sync state: the last sequence number applied, plus refs so socket
+  // handlers (bound once per connection) always see the latest data
+  const lastSeqRef = useRef(null);
+  const tournamentRef = useRef(null);
+  const socketRef = useRef(null);
+  const reconnectTimeoutRef = useRef(null);
+  const unmountedRef = useRef(false);
+  // Commands sent over the socket, waiting for their ack/error frame
+  const pendingCommandsRef = useRef({});
+  const commandCounterRef = useRef(0);
 
   useEffect(() => {
+    unmountedRef.current = false;
+    lastSeqRef.current = null;
     fetchInitialData();
     connectWebSocket();
     
     return () => {
-      if (socket) {
-        socket.close();
+      unmountedRef.current = true;
+      if (reconnectTimeoutRef.current) {
+        clearTimeout(reconnectTimeoutRef.current);
+      }
+      if (socketRef.current) {
+        socketRef.current.close();
       }
       if (timerRef.current) {
         clearInterval(timerRef.current);
@@ -211,26 +227,44 @@ const AuctionRoom = ({ tournamentId, user }) => {
     };
   }, [tournamentId]);
 
+  useEffect(() => {
+    tournamentRef.current = tournament;
+  }, [tournament]);
+
+  // The snapshot and catalog load independently - resolve the current team once both are in
+  useEffect(() => {
+    const currentTeamId = tournament?.status === 'auction_active' ? tournament.current_team_id : null;
+    setCurrentTeam(currentTeamId ? teams.find(t => t.id === currentTeamId) || null : null);
+  }, [tournament?.status, tournament?.current_team_id, teams]);
+
   useEffect(() => {
     if (chatContainerRef.current) {
       chatContainerRef.current.scrollTop = chatContainerRef.current.scrollHeight;
     }
   }, [chatMessages]);
 
-  const connectWebSocket = () => {
+  const connectWebSocket = (attempt = 0) => {
     try {
       // Simplified WebSocket URL - remove the protocol replacement
       const wsUrl = 'wss://soccer-league-bid.preview.emergentagent.com';
-      const ws = new WebSocket(`${wsUrl}/ws/${tournamentId}`);
+      // Resume from the last applied event so the server only replays what we missed
+      const params = new URLSearchParams({ user_id: user.id });
+      if (lastSeqRef.current !== null) {
+        params.set('since', lastSeqRef.current);
+      }
+      const ws = new WebSocket(`${wsUrl}/ws/${tournamentId}?${params}`);
       
-      console.log('Connecting to WebSocket:', `${wsUrl}/ws/${tournamentId}`);
+      console.log('Connecting to WebSocket:', `${wsUrl}/ws/${tournamentId}?${params}`);
       
       ws.onopen = () => {
         console.log('WebSocket connected successfully');
         setIsConnected(true);
+        attempt = 0;
       };
       
       ws.onmessage = (event) => {
+        // Ignore frames still arriving on a socket we are replacing
+        if (ws !== socketRef.current) return;
         const message = JSON.parse(event.data);
         console.log('WebSocket message received:', message);
         handleWebSocketMessage(message);
@@ -239,7 +273,13 @@ const AuctionRoom = ({ tournamentId, user }) => {
       ws.onclose = (event) => {
         console.log('WebSocket disconnected:', event.code, event.reason);
         setIsConnected(false);
-        // Don't auto-reconnect for now to avoid spam
+        // Commands in flight on this socket will never be acked
+        Object.values(pendingCommandsRef.current).forEach(({ reject }) => reject(new Error('Connection lost')));
+        pendingCommandsRef.current = {};
+        if (unmountedRef.current) return;
+        // Reconnect with capped exponential backoff and resume from lastSeqRef
+        const delay = Math.min(1000 * 2 ** attempt, 15000);
+        reconnectTimeoutRef.current = setTimeout(() => connectWebSocket(attempt + 1), delay);
       };
       
       ws.onerror = (error) => {
@@ -247,6 +287,7 @@ const AuctionRoom = ({ tournamentId, user }) => {
         setIsConnected(false);
       };
       
+      socketRef.current = ws;
       setSocket(ws);
     } catch (error) {
       console.error('Failed to connect WebSocket:', error);
@@ -254,229 +295,253 @@ const AuctionRoom = ({ tournamentId, user }) => {
     }
   };
 
+  // Forget the sequence position and reconnect; the new socket starts with a snapshot
+  const resync = (reason) => {
+    console.warn('Resyncing auction room:', reason);
+    lastSeqRef.current = null;
+    const ws = socketRef.current;
+    socketRef.current = null;
+    if (ws) {
+      ws.close();
+    }
+  };
+
   const handleWebSocketMessage = (message) => {
+    // A snapshot replaces all local state and restarts sequence tracking
+    if (message.type === 'snapshot') {
+      lastSeqRef.current = message.seq;
+      applySnapshot(message);
+      return;
+    }
+
+    // Every tournament event carries a sequence number and the server sends them
+    // in order. A repeat is skipped; a gap (or an older event) means something was
+    // missed, so reconnect for a fresh snapshot rather than show a stale room.
+    if (message.seq !== undefined) {
+      if (lastSeqRef.current === null) return; // Waiting for the snapshot
+      if (message.seq === lastSeqRef.current) return;
+      if (message.seq !== lastSeqRef.current + 1) {
+        resync(`expected event ${lastSeqRef.current + 1}, got ${message.seq}`);
+        return;
+      }
+      lastSeqRef.current = message.seq;
+    }
+
     switch (message.type) {
+      case 'ack':
+      case 'error': {
+        const pending = pendingCommandsRef.current[message.id];
+        if (!pending) {
+          console.log('Unmatched command reply:', message);
+          break;
+        }
+        delete pendingCommandsRef.current[message.id];
+        if (message.type === 'ack') {
+          pending.resolve(message.result);
+        } else {
+          const error = new Error(typeof message.detail === 'string' ? message.detail : 'Invalid command');
+          error.detail = message.detail;
+          pending.reject(error);
+        }
+        break;
+      }
+      case 'ping':
+        // Server heartbeat - sockets that stay silent get evicted
+        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
+          socketRef.current.send(JSON.stringify({ type: 'pong' }));
+        }
+        break;
       case 'auction_started':
-        fetchCurrentTeam();
+        setTournament(prev => prev && { ...prev, status: message.status });
+        applyLotChange(message.current_team_id, message.bid_end_time);
+        break;
+      case 'lot_changed':
+        applyLotChange(message.current_team_id, message.bid_end_time);
+        break;
+      case 'timer_reset':
+        startCountdown(message.bid_end_time);
         break;
       case 'new_bid':
         setCurrentBid({
           amount: message.amount,
           username: message.username
         });
+        setTeamBidHistory(prev => [{
+          id: message.bid_id,
+          user_id: message.user_id,
+          team_id: message.team_id,
+          amount: message.amount,
+          timestamp: message.timestamp,
+          username: message.username,
+          timeAgo: formatTimeAgo(message.timestamp)
+        }, ...prev.filter(bid => bid.id !== message.bid_id)].slice(0, 5));
+        break;
+      case 'participant_joined':
+        setParticipants(prev => prev.some(p => p.id === message.user_id)
+          ? prev
+          : [...prev, { id: message.user_id, username: message.username }]);
+        applySquadUpdate(message.squad);
+        setTournament(prev => prev && {
+          ...prev,
+          participants: prev.participants.includes(message.user_id) ? prev.participants : [...prev.participants, message.user_id],
+          prize_pool: message.prize_pool
+        });
         break;
-      case 'team_sold':
-        fetchSquads();
-        fetchCurrentTeam();
+      case 'lot_settled':
+        // The server awards the lot; the winner's updated squad comes with the event
+        applySquadUpdate(message.squad);
+        setTournament(prev => prev && {
+          ...prev,
+          settled_team_ids: [...(prev.settled_team_ids || []).filter(id => id !== message.team_id), message.team_id]
+        });
         break;
       case 'chat_message':
-        setChatMessages(prev => [...prev, {
+        setChatMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, {
+          id: message.id,
+          user_id: message.user_id,
           username: message.username,
           message: message.message,
           timestamp: message.timestamp
         }]);
         break;
       case 'auction_ended':
+        setTournament(prev => prev && { ...prev, status: message.status, current_team_id: null, bid_end_time: null });
         alert('Auction has ended!');
         break;
+      case 'admin_changed':
+        setTournament(prev => prev && { ...prev, admin_id: message.admin_id });
+        break;
       default:
         console.log('Unknown message type:', message.type);
     }
   };
 
+  // Apply a lot change pushed by the server without refetching the tournament or bids
+  const applyLotChange = (currentTeamId, bidEndTime) => {
+    setTournament(prev => prev && { ...prev, current_team_id: currentTeamId, bid_end_time: bidEndTime });
+    setCurrentBid(null);
+    setTeamBidHistory([]);
+    startCountdown(bidEndTime);
+  };
+
+  const startCountdown = (bidEndTime) => {
+    if (timerRef.current) {
+      clearInterval(timerRef.current);
+    }
+    if (!bidEndTime) {
+      setTimeRemaining(0);
+      return 0;
+    }
+    const endTime = new Date(bidEndTime);
+    const now = new Date();
+    return runCountdown(Math.max(0, Math.floor((endTime - now) / 1000)));
+  };
+
+  const runCountdown = (remaining) => {
+    if (timerRef.current) {
+      clearInterval(timerRef.current);
+    }
+    setTimeRemaining(remaining);
+    
+    // Only start countdown timer if there's time remaining
+    if (remaining > 0) {
+      timerRef.current = setInterval(() => {
+        setTimeRemaining(prev => {
+          if (prev <= 1) {
+            // The server advances the lot when its timer expires and sends lot_changed
+            clearInterval(timerRef.current);
+            return 0;
+          }
+          return prev - 1;
+        });
+      }, 1000);
+    }
+    return remaining;
+  };
+
+  // Tournament state, participants, squads and chat all arrive in the snapshot
+  // frame pushed on connect - only the team catalog is fetched over HTTP
   const fetchInitialData = async () => {
     try {
-      console.log('Fetching initial data for tournament:', tournamentId);
-      
-      // Fetch tournament and teams in parallel
-      const [tournamentRes, teamsRes] = await Promise.all([
-        axios.get(`${API}/tournaments/${tournamentId}`),
-        axios.get(`${API}/teams`)
-      ]);
-      
-      console.log('Tournament data:', tournamentRes.data);
-      console.log('bid_end_time from tournament:', tournamentRes.data.bid_end_time);
+      console.log('Fetching team catalog for tournament:', tournamentId);
+      const teamsRes = await axios.get(`${API}/teams`);
       console.log('Teams loaded:', teamsRes.data.length);
-      
-      // Set tournament and teams state first
-      setTournament(tournamentRes.data);
       setTeams(teamsRes.data);
-      
-      // Calculate time remaining (moved here to work regardless of currentTeam)
-      if (tournamentRes.data.bid_end_time) {
-        const endTime = new Date(tournamentRes.data.bid_end_time);
-        const now = new Date();
-        const remaining = Math.max(0, Math.floor((endTime - now) / 1000));
-        setTimeRemaining(remaining);
-        
-        console.log('Timer initialization:', {
-          bid_end_time: tournamentRes.data.bid_end_time,
-          remaining: remaining,
-          expired: remaining <= 0
-        });
-        
-        // Only start countdown timer if there's time remaining
-        if (remaining > 0) {
-          // Start countdown timer
-          if (timerRef.current) {
-            clearInterval(timerRef.current);
-          }
-          timerRef.current = setInterval(() => {
-            setTimeRemaining(prev => {
-              if (prev <= 1) {
-                clearInterval(timerRef.current);
-                // Auto-advance to next team when timer expires (only if not already auto-advancing)
-                if (!autoAdvancing) {
-                  advanceToNextTeam();
-                }
-                return 0;
-              }
-              return prev - 1;
-            });
-          }, 1000);
-        } else {
-          // Timer already expired - show manual controls but don't auto-advance on page load
-          console.log('Timer already expired on page load - showing manual controls');
-        }
-      }
-      
-      // Fetch chat messages
-      try {
-        const chatRes = await axios.get(`${API}/tournaments/${tournamentId}/chat`);
-        setChatMessages(chatRes.data);
-      } catch (chatError) {
-        console.log('No chat messages yet:', chatError.message);
-        setChatMessages([]);
-      }
-      
-      // Fetch participants
-      if (tournamentRes.data.participants && tournamentRes.data.participants.length > 0) {
-        const participantPromises = tournamentRes.data.participants.map(id => 
-          axios.get(`${API}/users/${id}`)
-        );
-        const participantResponses = await Promise.all(participantPromises);
-        setParticipants(participantResponses.map(res => res.data));
-      }
-      
-      // NOW fetch current team using the loaded teams data AND set it directly
-      if (tournamentRes.data.status === 'auction_active' && tournamentRes.data.current_team_id) {
-        console.log('Auction is active, finding current team directly');
-        const currentTeamDirect = teamsRes.data.find(t => t.id === tournamentRes.data.current_team_id);
-        console.log('Direct team lookup result:', currentTeamDirect);
-        
-        if (currentTeamDirect) {
-          console.log('Setting current team immediately');
-          setCurrentTeam(currentTeamDirect);
-          setForceRender(prev => prev + 1);
-        }
-      }
-      
     } catch (error) {
       console.error('Failed to fetch initial data:', error);
       alert('Failed to load auction data. Please try again.');
     }
   };
 
-  const fetchCurrentTeam = async (teamsData = teams) => {
-    try {
-      console.log('Fetching current team...', {
-        tournamentId,
-        teamsDataLength: teamsData.length,
-        teamsState: teams.length
-      });
-      const response = await axios.get(`${API}/tournaments/${tournamentId}`);
-      const tournament = response.data;
-      
-      console.log('Tournament current_team_id:', tournament.current_team_id);
-      
-      if (tournament.current_team_id && teamsData.length > 0) {
-        const team = teamsData.find(t => t.id === tournament.current_team_id);
-        console.log('Team lookup result:', team);
-        
-        if (team) {
-          console.log('Setting currentTeam state to:', team);
-          setCurrentTeam(team);
-          
-          // Force a re-render to ensure state update takes effect
-          setForceRender(prev => prev + 1);
-          
-          // Force a re-render by updating tournament state too
-          setTournament(tournament);
-          
-          console.log('State update completed');
-        } else {
-          console.error('Team not found! ID:', tournament.current_team_id);
-          console.log('All team IDs:', teamsData.map(t => t.id));
-          setCurrentTeam(null);
-        }
-        
-        // Get current highest bid
-        try {
-          const bidsResponse = await axios.get(`${API}/tournaments/${tournamentId}/bids`);
-          const teamBids = bidsResponse.data.filter(bid => bid.team_id === tournament.current_team_id);
-          
-          // Set bid history for current team
-          const sortedBids = teamBids
-            .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp))
-            .slice(0, 5); // Show last 5 bids
-          
-          const bidHistory = await Promise.all(
-            sortedBids.map(async (bid) => {
-              const bidder = participants.find(p => p.id === bid.user_id);
-              return {
-                ...bid,
-                username: bidder?.username || 'Unknown',
-                timeAgo: formatTimeAgo(bid.timestamp)
-              };
-            })
-          );
-          setTeamBidHistory(bidHistory);
-          
-          if (teamBids.length > 0) {
-            const highestBid = teamBids.reduce((max, bid) => bid.amount > max.amount ? bid : max);
-            const bidder = participants.find(p => p.id === highestBid.user_id);
-            setCurrentBid({
-              amount: highestBid.amount,
-              username: bidder?.username || 'Unknown'
-            });
-          } else {
-            setCurrentBid(null);
-            setTeamBidHistory([]);
-          }
-        } catch (bidError) {
-          console.log('No bids yet:', bidError.message);
-          setCurrentBid(null);
-          setTeamBidHistory([]);
-        }
-      } else {
-        console.log('No current team ID or teams not loaded yet');
-        setCurrentTeam(null);
+  const applySnapshot = (snapshot) => {
+    const snapshotTournament = snapshot.tournament;
+    console.log('Snapshot received:', { seq: snapshot.seq, status: snapshotTournament.status });
+    
+    setTournament(snapshotTournament);
+    setParticipants(snapshot.participants);
+    setChatMessages(snapshot.chat);
+    applySquads(snapshot.squads, snapshotTournament.budget_per_user);
+    setCurrentBid(snapshot.high_bid && {
+      amount: snapshot.high_bid.amount,
+      username: snapshot.high_bid.username
+    });
+    setTeamBidHistory(snapshot.recent_bids.map(bid => ({
+      ...bid,
+      timeAgo: formatTimeAgo(bid.timestamp)
+    })));
+    
+    // Use the server's remaining time rather than our own clock
+    runCountdown(snapshot.time_remaining);
+  };
+
+  const applySquads = (squadList, budgetPerUser) => {
+    setSquads(squadList);
+    
+    // Create user squad mapping for budget tracking
+    const squadMap = {};
+    squadList.forEach(squad => {
+      squadMap[squad.user_id] = {
+        total_spent: squad.total_spent || 0,
+        teams_count: squad.teams ? squad.teams.length : 0,
+        remaining_budget: budgetPerUser - (squad.total_spent || 0)
+      };
+    });
+    setUserSquads(squadMap);
+  };
+
+  const applySquadUpdate = (squad) => {
+    setSquads(prev => [...prev.filter(sq => sq.user_id !== squad.user_id), squad]);
+    setUserSquads(prev => ({
+      ...prev,
+      [squad.user_id]: {
+        total_spent: squad.total_spent,
+        teams_count: squad.teams.length,
+        remaining_budget: (tournamentRef.current?.budget_per_user || 0) - squad.total_spent
       }
-    } catch (error) {
-      console.error('Failed to fetch current team:', error);
-    }
+    }));
   };
 
-  const fetchSquads = async () => {
-    try {
-      const response = await axios.get(`${API}/tournaments/${tournamentId}/squads`);
-      setSquads(response.data);
-      
-      // Create user squad mapping for budget tracking
-      const squadMap = {};
-      response.data.forEach(squad => {
-        squadMap[squad.user_id] = {
-          total_spent: squad.total_spent || 0,
-          teams_count: squad.teams ? squad.teams.length : 0,
-          remaining_budget: tournament.budget_per_user - (squad.total_spent || 0)
-        };
-      });
-      setUserSquads(squadMap);
-    } catch (error) {
-      console.error('Failed to fetch squads:', error);
-      setSquads([]);
-      setUserSquads({});
+  // Send a command over the open socket and wait for its ack; falls back to
+  // the equivalent REST call when the socket is not connected. Commands carry no
+  // idempotency key: nothing resends them, and a bid or chat message is cheap to
+  // repeat by hand, so the key would only add writes to every command.
+  const sendCommand = (command, restFallback) => {
+    commandCounterRef.current += 1;
+    const id = `${user.id}-${commandCounterRef.current}`;
+    const ws = socketRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+      return restFallback().then(response => response.data);
     }
+    return new Promise((resolve, reject) => {
+      pendingCommandsRef.current[id] = { resolve, reject };
+      ws.send(JSON.stringify({ ...command, id }));
+      setTimeout(() => {
+        if (pendingCommandsRef.current[id]) {
+          delete pendingCommandsRef.current[id];
+          reject(new Error('Timed out waiting for server'));
+        }
+      }, 10000);
+    });
   };
 
   const placeBid = async () => {
@@ -486,30 +551,36 @@ const AuctionRoom = ({ tournamentId, user }) => {
     
     try {
       console.log(`Placing bid: £${bidAmount}m (${amount} pence) for ${currentTeam.name}`);
-      const response = await axios.post(`${API}/tournaments/${tournamentId}/bid?user_id=${user.id}&amount=${amount}`);
-      console.log('Bid response:', response.data);
+      const result = await sendCommand(
+        { type: 'bid', amount },
+        () => axios.post(`${API}/tournaments/${tournamentId}/bid?user_id=${user.id}&amount=${amount}`)
+      );
+      console.log('Bid response:', result);
       setBidAmount('');
       alert('Bid placed successfully!');
     } catch (error) {
-      console.error('Bid error:', error.response?.data);
-      alert('Bid failed: ' + error.response?.data?.detail);
+      console.error('Bid error:', error.response?.data || error.detail);
+      alert('Bid failed: ' + (error.response?.data?.detail || error.message));
     }
   };
 
   const [autoAdvancing, setAutoAdvancing] = useState(false);
 
-  // Function to advance to next team
+  // Manually advance to next team (lots normally advance on the server when the timer expires)
   const advanceToNextTeam = async () => {
     if (autoAdvancing) {
-      console.log('Auto-advance already in progress, skipping...');
+      console.log('Advance already in progress, skipping...');
       return;
     }
     
     setAutoAdvancing(true);
-    console.log('Auto-advancing to next team...');
+    console.log('Advancing to next team...');
     
     try {
-      const response = await axios.post(`${API}/tournaments/${tournamentId}/advance-team`);
+      // Only advance the lot we are looking at - a 409 means someone else already did
+      const response = await axios.post(`${API}/tournaments/${tournamentId}/advance-team`, null, {
+        params: { expected_team_id: tournament?.current_team_id }
+      });
       console.log('Advanced to next team:', response.data);
       
       if (response.data.status === 'completed') {
@@ -517,14 +588,11 @@ const AuctionRoom = ({ tournamentId, user }) => {
         alert('🎉 Auction completed! All players have been assigned.');
         // Refresh the page to show final results
         window.location.reload();
-      } else {
-        // Refresh data to show new current team
-        fetchInitialData();
       }
+      // The new lot arrives as a lot_changed event on the socket - no refetch needed
     } catch (error) {
+      // A 409 means the lot already advanced - the lot change still arrives on the socket
       console.error('Error advancing to next team:', error);
-      // Still refresh to get latest state
-      fetchInitialData();
     } finally {
       // Reset the flag after a delay to prevent rapid consecutive calls
       setTimeout(() => {
@@ -547,9 +615,10 @@ const AuctionRoom = ({ tournamentId, user }) => {
     if (!chatInput.trim()) return;
     
     try {
-      await axios.post(`${API}/tournaments/${tournamentId}/chat?user_id=${user.id}`, {
-        message: chatInput
-      });
+      await sendCommand(
+        { type: 'chat', message: chatInput },
+        () => axios.post(`${API}/tournaments/${tournamentId}/chat?user_id=${user.id}`, { message: chatInput })
+      );
       setChatInput('');
     } catch (error) {
       console.error('Failed to send chat message:', error);
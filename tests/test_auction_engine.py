@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from auction_engine import AuctionEngine, LiveAuction
+
+
+def engine_with_live_lot():
+    engine = AuctionEngine(db=None, writer=None)
+    tournament = {
+        "id": "t", "status": "auction_active", "current_team_id": "a",
+        "bid_end_time": datetime.utcnow() + timedelta(minutes=1),
+        "minimum_bid": 1, "budget_per_user": 100, "teams_per_user": 2,
+    }
+    engine.auctions["t"] = LiveAuction(tournament, [{"user_id": "u"}], [{"id": "u", "username": "u"}])
+    return engine
+
+
+def test_bids_are_rejected_while_the_lot_is_closing():
+    engine = engine_with_live_lot()
+
+    with engine.closing("t"):
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(engine.accept_bid("t", "u", 5))
+
+    assert raised.value.detail == "Lot is closing"
+    assert engine.auctions["t"].high_bid is None
+
+
+def test_bids_are_accepted_again_once_every_close_ends():
+    engine = engine_with_live_lot()
+
+    with engine.closing("t"):
+        with engine.closing("t"):
+            pass
+        with pytest.raises(HTTPException):
+            asyncio.run(engine.accept_bid("t", "u", 5))
+
+    assert asyncio.run(engine.accept_bid("t", "u", 5)).high_bid == 5
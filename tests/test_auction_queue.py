@@ -0,0 +1,85 @@
+from auction_queue import auction_complete, next_lot
+
+
+def apply(document, update):
+    """Apply the update operators next_lot produces, the way Mongo would"""
+    for field, amount in update.get("$inc", {}).items():
+        document[field] = document.get(field, 0) + amount
+    for field, value in update.get("$push", {}).items():
+        if isinstance(value, dict):
+            items = document[field] + value["$each"]
+            document[field] = items[value["$slice"]:] if value["$slice"] else []
+        else:
+            document[field] = document[field] + [value]
+    for field, end in update.get("$pop", {}).items():
+        document[field] = document[field][1:] if end == -1 else document[field][:-1]
+    return document
+
+
+def advance(document, had_bids):
+    team_id, update = next_lot(
+        document["auction_order"], document["auction_cursor"], document["reauction_queue"],
+        document["current_team_id"], had_bids
+    )
+    apply(document, update)
+    document["current_team_id"] = team_id
+    return team_id
+
+
+def tournament(order, cursor=1, queue=()):
+    return {"auction_order": list(order), "auction_cursor": cursor,
+            "reauction_queue": list(queue), "current_team_id": order[cursor - 1]}
+
+
+def test_sold_lot_moves_the_cursor():
+    team_id, update = next_lot(["a", "b", "c"], 1, [], "a", had_bids=True)
+    assert team_id == "b"
+    assert update == {"$inc": {"auction_cursor": 1}}
+
+
+def test_unsold_lot_is_pushed_for_reauction():
+    team_id, update = next_lot(["a", "b", "c"], 1, [], "a", had_bids=False)
+    assert team_id == "b"
+    assert update == {"$inc": {"auction_cursor": 1}, "$push": {"reauction_queue": "a"}}
+
+
+def test_sold_reauctioned_lot_pops_the_queue_head():
+    team_id, update = next_lot(["a", "b"], 2, ["a", "c"], "b", had_bids=True)
+    assert team_id == "a"
+    assert update == {"$pop": {"reauction_queue": -1}}
+
+
+def test_unsold_reauctioned_lot_drops_the_head_and_requeues():
+    document = {"auction_order": ["a", "b"], "auction_cursor": 2, "reauction_queue": ["y", "z"], "current_team_id": "x"}
+    team_id, update = next_lot(["a", "b"], 2, ["y", "z"], "x", had_bids=False)
+    assert team_id == "y"
+    assert update == {"$push": {"reauction_queue": {"$each": ["x"], "$slice": -2}}}
+    assert apply(document, update)["reauction_queue"] == ["z", "x"]
+
+
+def test_last_unsold_lot_is_auctioned_again():
+    assert next_lot(["a"], 1, [], "a", had_bids=False) == ("a", {})
+
+
+def test_last_sold_lot_leaves_nothing_to_auction():
+    assert next_lot(["a", "b"], 2, [], "b", had_bids=True) == (None, {})
+
+
+def test_full_auction_sells_every_team_once():
+    document = tournament(["a", "b", "c"])
+    settled, opened = set(), ["a"]
+    # a: no bid, b: sold, c: no bid, a: sold, c: no bid (alone), c: sold
+    for had_bids in [False, True, False, True, False, True]:
+        current = document["current_team_id"]
+        if had_bids:
+            settled.add(current)
+            if auction_complete(settled, document["auction_order"]):
+                break
+        opened.append(advance(document, had_bids))
+    assert opened == ["a", "b", "c", "a", "c", "c"]
+    assert settled == {"a", "b", "c"}
+
+
+def test_auction_complete_needs_every_team():
+    assert not auction_complete(["a", "b"], ["a", "b", "c"])
+    assert auction_complete(["c", "b", "a"], ["a", "b", "c"])
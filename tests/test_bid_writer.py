@@ -0,0 +1,83 @@
+import asyncio
+
+from pymongo.errors import PyMongoError
+
+from auction_engine import BidWriter
+
+
+class FakeBids:
+    """insert_many blocks for tournaments listed in `blocked` until released"""
+
+    def __init__(self):
+        self.rows = []
+        self.blocked = {}
+        self.failures = 0
+
+    async def insert_many(self, documents, ordered=True):
+        for document in documents:
+            gate = self.blocked.get(document["tournament_id"])
+            if gate is not None:
+                await gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise PyMongoError("unavailable")
+        self.rows.extend(documents)
+
+    async def insert_one(self, document):
+        self.rows.append(document)
+
+
+class FakeTournaments:
+    async def bulk_write(self, operations):
+        pass
+
+
+class FakeDb:
+    def __init__(self):
+        self.bids = FakeBids()
+        self.tournaments = FakeTournaments()
+
+
+def bid(tournament_id, amount):
+    return {"id": f"{tournament_id}-{amount}", "tournament_id": tournament_id,
+            "team_id": "team", "user_id": "u", "amount": amount}
+
+
+def test_flush_waits_only_for_its_own_tournament():
+    async def scenario():
+        db = FakeDb()
+        writer = BidWriter(db, batch_size=1)
+        await writer.start()
+        await writer.submit(bid("a", 1))
+        await writer.flush("a")
+        assert [row["id"] for row in db.bids.rows] == ["a-1"]
+
+        # Bids queued behind ours for another (stuck) room do not hold up our flush
+        db.bids.blocked["busy"] = asyncio.Event()
+        await writer.submit(bid("a", 2))
+        await writer.submit(bid("busy", 1))
+        await asyncio.wait_for(writer.flush("a"), 1)
+        flush_busy = asyncio.ensure_future(writer.flush("busy"))
+        await asyncio.sleep(0.01)
+        assert not flush_busy.done()
+
+        db.bids.blocked.pop("busy").set()
+        await asyncio.wait_for(flush_busy, 1)
+        assert {row["id"] for row in db.bids.rows} == {"a-1", "a-2", "busy-1"}
+        assert not writer._waiters and not writer._submitted
+        await writer.stop()
+    asyncio.run(scenario())
+
+
+def test_failing_batch_is_retried_a_bounded_number_of_times():
+    async def scenario():
+        db = FakeDb()
+        db.bids.failures = 100
+        writer = BidWriter(db, max_attempts=2)
+        await writer.start()
+        await writer.submit(bid("a", 1))
+        await asyncio.wait_for(writer.flush("a"), 2)
+        # Fell back to writing the bid on its own
+        assert [row["id"] for row in db.bids.rows] == ["a-1"]
+        await writer.stop()
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from idempotency import IdempotencyStore
+
+
+class FakeKeys:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, document):
+        if document["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate")
+        self.docs[document["_id"]] = dict(document)
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update):
+        self.docs[query["_id"]].update(update["$set"])
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc and doc["state"] == query["state"]:
+            del self.docs[query["_id"]]
+
+
+class FakeDb:
+    def __init__(self):
+        self.idempotency_keys = FakeKeys()
+
+
+def counting_handler(calls, result="ok"):
+    async def handler():
+        calls.append(1)
+        return {"result": result}
+    return handler
+
+
+def test_first_request_claims_the_key_and_stores_its_response():
+    store = IdempotencyStore(FakeDb())
+    calls = []
+
+    response = asyncio.run(store.run("bid:t:u", "k1", counting_handler(calls)))
+
+    assert response == {"result": "ok"}
+    assert store.collection.docs["bid:t:u:k1"]["state"] == "done"
+    assert store.collection.docs["bid:t:u:k1"]["response"] == {"result": "ok"}
+
+
+def test_retry_replays_the_stored_response():
+    store = IdempotencyStore(FakeDb())
+    calls = []
+
+    async def scenario():
+        first = await store.run("bid:t:u", "k1", counting_handler(calls, "first"))
+        second = await store.run("bid:t:u", "k1", counting_handler(calls, "second"))
+        return first, second
+
+    assert asyncio.run(scenario()) == ({"result": "first"}, {"result": "first"})
+    assert len(calls) == 1
+
+
+def test_retry_while_in_progress_is_a_conflict():
+    store = IdempotencyStore(FakeDb())
+
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow():
+            started.set()
+            await release.wait()
+            return {"result": "ok"}
+
+        first = asyncio.ensure_future(store.run("bid:t:u", "k1", slow))
+        await started.wait()
+        try:
+            with pytest.raises(HTTPException) as raised:
+                await store.run("bid:t:u", "k1", counting_handler([]))
+        finally:
+            release.set()
+            await first
+        return raised.value.status_code
+
+    assert asyncio.run(scenario()) == 409
+
+
+def test_failed_request_releases_the_key():
+    store = IdempotencyStore(FakeDb())
+    calls = []
+
+    async def failing():
+        raise HTTPException(status_code=400, detail="Bid too low")
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await store.run("bid:t:u", "k1", failing)
+        return await store.run("bid:t:u", "k1", counting_handler(calls))
+
+    assert asyncio.run(scenario()) == {"result": "ok"}
+    assert len(calls) == 1
+
+
+def test_without_a_key_the_handler_always_runs():
+    store = IdempotencyStore(FakeDb())
+    calls = []
+
+    async def scenario():
+        await store.run("chat:t:u", None, counting_handler(calls))
+        await store.run("chat:t:u", None, counting_handler(calls))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert store.collection.docs == {}
@@ -0,0 +1,51 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+import indexes
+
+
+class FakeCollection:
+    def __init__(self, conflict):
+        self.conflict = conflict
+        self.names = []
+
+    async def create_indexes(self, models):
+        if self.conflict and "expireAfterSeconds" in models[0].document:
+            raise OperationFailure("options conflict", code=indexes.INDEX_OPTIONS_CONFLICT)
+        self.names.extend(model.document["name"] for model in models)
+
+    async def list_indexes(self):
+        for name in self.names:
+            yield {"name": name}
+
+
+class FakeDb:
+    def __init__(self, conflict):
+        self.collections = {name: FakeCollection(conflict) for name in indexes.INDEXES}
+        self.commands = []
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    async def command(self, name, collection, **kwargs):
+        self.commands.append((name, collection, kwargs))
+
+
+def test_changed_ttl_is_applied_with_collmod():
+    db = FakeDb(conflict=True)
+
+    asyncio.run(indexes.ensure_indexes(db))
+
+    [(name, collection, kwargs)] = db.commands
+    assert (name, collection) == ("collMod", "idempotency_keys")
+    assert kwargs["index"]["expireAfterSeconds"] == indexes.IDEMPOTENCY_TTL_SECONDS
+
+
+def test_ttl_index_is_declared():
+    db = FakeDb(conflict=False)
+
+    report = asyncio.run(indexes.ensure_indexes(db))
+
+    assert "created_at_1" in db["idempotency_keys"].names
+    assert report["missing"] == {} and db.commands == []
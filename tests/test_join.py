@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+# server.py reads these at import time; no connection is made
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+import server  # noqa: E402
+
+
+class FakeTournaments:
+    def __init__(self, document):
+        self.document = document
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        if query["participants"]["$ne"] in self.document["participants"]:
+            return None
+        self.document["participants"].append(update["$addToSet"]["participants"])
+        self.document["prize_pool"] += update["$inc"]["prize_pool"]
+        return dict(self.document)
+
+    async def find_one(self, query, projection=None):
+        return dict(self.document)
+
+
+class FakeSquads:
+    """find_one_and_update raises while `failures` is set"""
+
+    def __init__(self):
+        self.rows = {}
+        self.failures = 0
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        if self.failures:
+            self.failures -= 1
+            raise PyMongoError("unavailable")
+        key = (query["tournament_id"], query["user_id"])
+        return self.rows.setdefault(key, dict(update["$setOnInsert"]))
+
+    async def find_one(self, query, projection=None):
+        return self.rows.get((query["tournament_id"], query["user_id"]))
+
+
+@pytest.fixture
+def join(monkeypatch):
+    tournament = server.Tournament(name="T", admin_id="admin", participants=["admin"],
+                                  competition_type="champions_league", teams_per_user=4)
+    db = type("FakeDb", (), {})()
+    db.tournaments = FakeTournaments(tournament.dict())
+    db.squads = FakeSquads()
+    monkeypatch.setattr(server, "db", db)
+
+    async def noop(*args):
+        pass
+
+    monkeypatch.setattr(server, "bump_version", noop)
+    monkeypatch.setattr(server, "broadcast_participant_joined", noop)
+    return db, lambda: asyncio.run(server.add_participant({"id": tournament.id, "entry_fee": 0}, "u1"))
+
+
+def test_retry_creates_the_squad_a_failed_join_left_out(join):
+    db, add = join
+    db.squads.failures = 1
+    with pytest.raises(PyMongoError):
+        add()
+    assert "u1" in db.tournaments.document["participants"]
+
+    add()
+
+    assert db.squads.rows[(db.tournaments.document["id"], "u1")]["user_id"] == "u1"
+    assert db.tournaments.document["participants"].count("u1") == 1
+
+
+def test_repeat_join_is_rejected(join):
+    db, add = join
+    add()
+
+    with pytest.raises(HTTPException) as raised:
+        add()
+
+    assert raised.value.detail == "Already joined"
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from lot_scheduler import LotScheduler
+
+
+class FakeTournaments:
+    def find(self, query, projection):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+class FakeDb:
+    tournaments = FakeTournaments()
+
+
+def test_failed_expiry_is_retried():
+    async def scenario():
+        calls = []
+
+        async def on_expire(tournament_id, team_id):
+            calls.append((tournament_id, team_id))
+            if len(calls) == 1:
+                raise RuntimeError("lost the close")
+
+        scheduler = LotScheduler(on_expire, retry_delay=0.01)
+        await scheduler.start(FakeDb())
+        scheduler.schedule("t1", "team", datetime.utcnow())
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert calls == [("t1", "team"), ("t1", "team")]
+        assert scheduler.pending() == 0
+    asyncio.run(scenario())
+
+
+def test_rescheduled_lot_is_not_retried():
+    async def scenario():
+        calls = []
+        scheduler = None
+
+        async def on_expire(tournament_id, team_id):
+            calls.append(team_id)
+            if team_id == "old":
+                # The lot moved on before the failure
+                scheduler.schedule(tournament_id, "new", datetime.utcnow() + timedelta(hours=1))
+                raise RuntimeError("settlement failed")
+
+        scheduler = LotScheduler(on_expire, retry_delay=0.01)
+        await scheduler.start(FakeDb())
+        scheduler.schedule("t1", "old", datetime.utcnow())
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        assert calls == ["old"]
+        assert scheduler.pending() == 1
+    asyncio.run(scenario())
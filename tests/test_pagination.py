@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_tournament_cursor, encode_tournament_cursor
+
+
+def test_cursor_round_trip_filters_rows_after_position():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    cursor = encode_tournament_cursor({"created_at": created_at, "id": "t-42", "name": "ignored"})
+
+    assert decode_tournament_cursor(cursor) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": "t-42"}},
+    ]}
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_tournament_cursor({"created_at": datetime(2024, 1, 1), "id": "?/+&"})
+
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30=", "WyJub3QgYSBkYXRlIiwgInQiXQ==", "WzFd"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_tournament_cursor(cursor)
+
+    assert raised.value.status_code == 400
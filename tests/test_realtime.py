@@ -0,0 +1,119 @@
+import asyncio
+import json
+from collections import deque
+
+from realtime import FRAME_FORMAT_JSON, ConnectionManager
+
+
+class FakeConnection:
+    def __init__(self, tournament_id):
+        self.tournament_id = tournament_id
+        self.frame_format = FRAME_FORMAT_JSON
+        self.frames = []
+
+    def enqueue(self, frame):
+        self.frames.append(frame)
+        return True
+
+    def stop(self):
+        pass
+
+    @property
+    def seqs(self):
+        return [json.loads(frame)["seq"] for frame in self.frames]
+
+
+def room(manager, tournament_id="t1"):
+    connection = FakeConnection(tournament_id)
+    manager.active_connections[tournament_id] = [connection]
+    manager.watch_room(tournament_id)
+    return connection
+
+
+def event(seq):
+    return {"type": "lot_changed", "seq": seq}
+
+
+def test_events_are_delivered_in_sequence_order():
+    async def scenario():
+        manager = ConnectionManager(reorder_timeout=5)
+        connection = room(manager)
+        manager._next_seq["t1"] = 10
+        manager.deliver_local("t1", event(11))
+        manager.deliver_local("t1", event(12))
+        assert connection.seqs == []
+        manager.deliver_local("t1", event(10))
+        assert connection.seqs == [10, 11, 12]
+        assert [message["seq"] for message in manager.replay_buffers["t1"]] == [10, 11, 12]
+        assert not manager._reorder_tasks
+    asyncio.run(scenario())
+
+
+def test_missing_event_is_skipped_after_timeout_and_kept_for_replay():
+    async def scenario():
+        manager = ConnectionManager(reorder_timeout=0.01)
+        connection = room(manager)
+        manager._next_seq["t1"] = 10
+        manager.deliver_local("t1", event(11))
+        await asyncio.sleep(0.05)
+        assert connection.seqs == [11]
+        assert not manager.can_resume("t1", 9)
+
+        # A late arrival is not sent live (clients resync past the gap) but fills the buffer
+        manager.deliver_local("t1", event(10))
+        assert connection.seqs == [11]
+        assert [message["seq"] for message in manager.replay_buffers["t1"]] == [10, 11]
+        assert manager.can_resume("t1", 9)
+    asyncio.run(scenario())
+
+
+def test_can_resume_needs_every_event_after_since():
+    manager = ConnectionManager()
+    manager.replay_buffers["t1"] = deque([event(4), event(5), event(7)])
+    assert manager.can_resume("t1", 6)
+    assert not manager.can_resume("t1", 4)
+    assert not manager.can_resume("t1", 2)
+
+
+def test_watched_room_buffers_events_before_the_first_socket():
+    manager = ConnectionManager()
+    manager.deliver_local("t1", event(1))
+    assert "t1" not in manager.replay_buffers
+
+    manager.watch_room("t1")
+    manager.deliver_local("t1", event(2))
+    assert manager.can_resume("t1", 1)
+
+
+def test_coalesced_bids_keep_only_the_latest_and_stay_before_later_events():
+    async def scenario():
+        manager = ConnectionManager()
+        await manager.start()
+        connection = room(manager)
+        await manager.broadcast_to_tournament("t1", {"type": "new_bid", "amount": 1}, coalesce_window=5)
+        await manager.broadcast_to_tournament("t1", {"type": "new_bid", "amount": 2}, coalesce_window=5)
+        assert connection.frames == []
+
+        # Any other event flushes the pending bid first, so order is preserved
+        await manager.broadcast_to_tournament("t1", {"type": "lot_changed"})
+        messages = [json.loads(frame) for frame in connection.frames]
+        assert [(message["type"], message.get("amount")) for message in messages] == [
+            ("new_bid", 2), ("lot_changed", None)
+        ]
+        assert [message["seq"] for message in messages] == [1, 2]
+        assert not manager._coalesce_tasks
+        await manager.stop()
+    asyncio.run(scenario())
+
+
+def test_coalesced_bid_goes_out_when_the_window_closes():
+    async def scenario():
+        manager = ConnectionManager()
+        await manager.start()
+        connection = room(manager)
+        await manager.broadcast_to_tournament("t1", {"type": "new_bid", "amount": 1}, coalesce_window=0.01)
+        await manager.broadcast_to_tournament("t1", {"type": "new_bid", "amount": 3}, coalesce_window=0.01)
+        await asyncio.sleep(0.05)
+        assert [json.loads(frame)["amount"] for frame in connection.frames] == [3]
+        await manager.stop()
+    asyncio.run(scenario())
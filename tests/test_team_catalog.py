@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from team_catalog import TeamCatalog, catalog_version, sync_catalog
+
+
+class FakeTeams:
+    """bulk_write reports the counts set in `result`"""
+
+    def __init__(self, upserted=0, modified=0, deleted=0):
+        self.result = SimpleNamespace(upserted_count=upserted, modified_count=modified, deleted_count=deleted)
+
+    async def bulk_write(self, operations, ordered=True):
+        return self.result
+
+
+class FakeVersions:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        doc["version"] += update["$inc"]["version"]
+
+
+TEAM = {"id": "t1", "name": "Lowry", "country": "Ireland", "competition": "ryder_cup"}
+
+
+def test_sync_bumps_version_only_when_rows_change():
+    versions = FakeVersions()
+
+    async def scenario():
+        assert await catalog_version(versions) == 0
+        await sync_catalog(FakeTeams(upserted=1), versions, [TEAM])
+        await sync_catalog(FakeTeams(), versions, [TEAM])
+        return await catalog_version(versions)
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_catalog_keeps_the_version_it_was_loaded_at():
+    catalog = TeamCatalog([TEAM], version=3)
+
+    assert catalog.version == 3
+    assert "ryder_cup" in catalog.by_competition